@@ -1,21 +1,48 @@
 # app.py - FastAPI con PostgreSQL
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
-import random
+from typing import Literal, Optional
+import asyncio
+import json
 import os
 
 # Importar módulos de base de datos y autenticación
-from database import get_db, test_connection
-from models import Usuario, Saldo
-from auth import verify_password, create_access_token, get_current_user
+from database import get_db, test_connection, database_ready, warm_up_pool, pool_status, log_pool_config, SessionLocal
+from models import Usuario
+from auth import check_password, create_access_token, get_current_user, get_current_admin, authenticate, UserSnapshot, warm_up as warm_up_auth
+from roulette import compile_bets, net_result, play_spins, InvalidBet
+from wallet import settle_spin, settle_batch, get_balance, has_saldo, spins_in_flight
+from ledger import spin_ledger
+from balances import hot_balances
+from stats import player_stats, LEADERBOARD_SIZE
+from onboarding import import_users, apply_credits, BulkError
+from ratelimit import rate_limiter, client_ip, login_rate_ip, login_rate_email, autologin_rate_ip, autologin_rate_email
+from rng import wheel_rng
+from tables import tables
+from static_assets import PrecompressedStaticFiles, CachedPage
+from serialization import FastJSONResponse, negotiated_body, negotiated_response, request_body_schema
+import metrics
 
 app = FastAPI()
 
+# Máximo de giros por request de autoplay
+MAX_BATCH_SPINS = int(os.getenv("MAX_BATCH_SPINS", "100"))
+
+# Segundos que el apagado espera a los giros en curso antes de cerrar el ledger
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "20"))
+
+# WebSocket: segundos sin mensajes antes de cerrar y respuestas pendientes por conexión
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "300"))
+WS_MAX_PENDING = int(os.getenv("WS_MAX_PENDING", "32"))
+
 # PERMITIR CUALQUIER ORIGEN (web + app inventor)
 app.add_middleware(
     CORSMiddleware,
@@ -25,30 +52,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# SERVIR CARPETA STATIC
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# -----------------------------------------------------------
-#  RULETA EUROPEA — ORDEN REAL OFICIAL (sentido horario)
-# -----------------------------------------------------------
-WHEEL_ORDER = [
-    0, 32, 15, 19, 4, 21, 2, 25, 17, 34, 6,
-    27, 13, 36, 11, 30, 8, 23, 10, 5, 24,
-    16, 33, 1, 20, 14, 31, 9, 22, 18, 29,
-    7, 28, 12, 35, 3, 26
-]
-
-RED_NUMBERS = {
-    1, 3, 5, 7, 9, 12, 14, 16,
-    18, 19, 21, 23, 25, 27,
-    30, 32, 34, 36
-}
-
-def color_of(n):
-    """Determinar color del número"""
-    if n == 0:
-        return "verde"
-    return "rojo" if n in RED_NUMBERS else "negro"
+# Tiempos de arranque (segundos desde que empezó a importarse app.py)
+startup_times = {}
+
+def _first_request():
+    startup_times["primer_request"] = time.perf_counter() - IMPORT_STARTED
+    print(f"⏱️ Primer request a los {startup_times['primer_request'] * 1000:.0f} ms de importar la app")
+
+for _fase in ("import", "startup", "primer_request"):
+    metrics.gauge("ruleta_startup_seconds", "Segundos desde el import de app hasta cada fase",
+                  lambda fase=_fase: startup_times.get(fase, 0), labels={"fase": _fase})
+
+# Latencia por ruta para /metrics
+app.add_middleware(metrics.MetricsMiddleware, on_first_request=_first_request)
+
+# Estado del pool de conexiones (se lee solo al hacer scrape, sin crear el engine)
+metrics.gauge("ruleta_db_pool_size", "Conexiones permanentes del pool", lambda: pool_status()["size"])
+metrics.gauge("ruleta_db_pool_checked_out", "Conexiones en uso", lambda: pool_status()["checked_out"])
+metrics.gauge("ruleta_db_pool_overflow", "Conexiones de overflow abiertas", lambda: pool_status()["overflow"])
+
+# SERVIR CARPETA STATIC (dist/ con hash: precomprimido y caché immutable)
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+
+# Página generada por build_assets.py (rutas con hash); si no existe, la original
+INDEX_PATH = "templates/dist/index.html" if os.path.exists("templates/dist/index.html") else "templates/index.html"
 
 # ========== MODELOS DE PYDANTIC ==========
 
@@ -81,13 +108,54 @@ class SpinResponse(BaseModel):
     winValue: int
     newBalance: float
 
+class WsSpinMessage(BaseModel):
+    currentBet: int
+    bets: list[BetItem]
+
+class BatchSpinRequest(BaseModel):
+    currentBet: int
+    bets: list[BetItem]
+    spins: int = Field(ge=1, le=MAX_BATCH_SPINS)
+    stopLoss: Optional[int] = None
+    stopWin: Optional[int] = None
+
+class BatchSpinResponse(BaseModel):
+    # Listas paralelas: un elemento por giro jugado
+    winningSpins: list[int]
+    winValues: list[int]
+    balances: list[float]
+    newBalance: float
+
+class LeaderboardEntry(BaseModel):
+    posicion: int
+    nombre: str
+    valor: float
+
+class LeaderboardResponse(BaseModel):
+    tipo: str
+    jugadores: list[LeaderboardEntry]
+
+class StatsResponse(BaseModel):
+    giros: int
+    totalApostado: float
+    totalGanado: float
+    mayorGanancia: float
+    numerosFavoritos: list[int]
+
 # ========== ENDPOINTS DE AUTENTICACIÓN ==========
 
 @app.post("/api/auth/login", response_model=LoginResponse)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
     """Login con email y password"""
-    # Buscar usuario por email
-    user = db.query(Usuario).filter(Usuario.email == credentials.email).first()
+    # Límite de intentos por IP y por email antes de tocar la BD o Argon2
+    await rate_limiter.check(
+        ("login:ip:" + client_ip(request), login_rate_ip),
+        ("login:email:" + credentials.email.lower(), login_rate_email),
+    )
+
+    # Buscar usuario por email (sin distinguir mayúsculas; usa ix_usuario_email_lower)
+    result = await db.execute(select(Usuario).where(func.lower(Usuario.email) == credentials.email.lower()))
+    user = result.scalars().first()
     
     if not user or not user.activo:
         raise HTTPException(
@@ -95,12 +163,20 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
             detail="Email o contraseña incorrectos"
         )
     
-    # Verificar password
-    if not verify_password(credentials.password, user.password_hash):
+    # Verificar password (Argon2 en su propio pool acotado)
+    valid, new_hash = await check_password(credentials.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos"
         )
+
+    # Re-hashear si cambiaron los parámetros de Argon2
+    if new_hash:
+        await db.execute(
+            update(Usuario).where(Usuario.id_usuario == user.id_usuario).values(password_hash=new_hash)
+        )
+        await db.commit()
     
     # Crear token JWT
     token = create_access_token({
@@ -108,143 +184,468 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
         "email": user.email
     })
     
-    return LoginResponse(
-        token=token,
-        user={
+    return FastJSONResponse({
+        "token": token,
+        "user": {
             "id_usuario": user.id_usuario,
             "nombre": user.nombre,
             "apellido": user.apellido,
             "email": user.email
         }
-    )
+    })
 
 # ========== ENDPOINTS DE SALDO ==========
 
 @app.get("/api/saldo", response_model=SaldoResponse)
-def get_saldo(current_user: Usuario = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_saldo(current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Obtener saldo actual del usuario autenticado"""
-    saldo = db.query(Saldo).filter(Saldo.id_usuario == current_user.id_usuario).first()
+    saldo = await get_balance(db, current_user.id_usuario)
     
-    if not saldo:
+    if saldo is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Saldo no encontrado"
         )
     
-    return SaldoResponse(
-        saldo=float(saldo.saldo_actual),
-        usuario={
+    return FastJSONResponse({
+        "saldo": float(saldo),
+        "usuario": {
             "nombre": current_user.nombre,
             "apellido": current_user.apellido
         }
-    )
+    })
 
 # ========== ENDPOINTS DE LA RULETA ==========
 
 @app.get("/")
-def serve_frontend(request: Request, response: Response, user_email: str = None, db: Session = Depends(get_db)):
+async def serve_frontend(request: Request, user_email: str = None):
     """
     Ruta raíz inteligente:
     Si recibe ?user_email=..., busca al usuario, crea un token y lo guarda en cookie.
     Permite login automático desde App Inventor.
+    La página se sirve desde memoria (ETag + gzip/brotli); solo se usa la BD con user_email.
     """
-    # Preparamos la respuesta (el archivo HTML)
-    file_response = FileResponse("templates/index.html")
+    # Sin user_email: respuesta desde memoria, 304 si el navegador ya la tiene
+    if not user_email:
+        return app.state.index_page.response(request.headers)
+
+    await rate_limiter.check(
+        ("autologin:ip:" + client_ip(request), autologin_rate_ip),
+        ("autologin:email:" + user_email.lower(), autologin_rate_email),
+    )
+
+    # Preparamos la respuesta (el HTML completo, para poder poner la cookie)
+    page_response = app.state.index_page.response(request.headers, conditional=False)
 
     # Si App Inventor nos mandó el email...
-    if user_email:
-        print(f"🔌 Conexión desde App Inventor para: {user_email}")
-        
-        # 1. Buscar usuario en la BD
-        user = db.query(Usuario).filter(Usuario.email == user_email).first()
+    print(f"🔌 Conexión desde App Inventor para: {user_email}")
+    
+    # 1. Buscar usuario en la BD
+    async with SessionLocal() as db:
+        result = await db.execute(select(Usuario).where(func.lower(Usuario.email) == user_email.lower()))
+        user = result.scalars().first()
+    
+    if user:
+        # 2. Crear Token automáticamente (Login sin contraseña)
+        # Esto es seguro porque confiamos en que tu App Inventor ya validó la contraseña antes
+        token = create_access_token({
+            "sub": str(user.id_usuario),
+            "email": user.email
+        })
         
-        if user:
-            # 2. Crear Token automáticamente (Login sin contraseña)
-            # Esto es seguro porque confiamos en que tu App Inventor ya validó la contraseña antes
-            token = create_access_token({
-                "sub": str(user.id_usuario),
-                "email": user.email
-            })
-            
-            # 3. Inyectar Token en la Cookie del navegador
-            file_response.set_cookie(
-                key="access_token",
-                value=token,
-                httponly=True,  # Más seguridad
-                samesite="lax"
-            )
-            print(f"✅ Token creado y enviado en cookie para {user_email}")
+        # 3. Inyectar Token en la Cookie del navegador
+        page_response.set_cookie(
+            key="access_token",
+            value=token,
+            httponly=True,  # Más seguridad
+            samesite="lax"
+        )
+        print(f"✅ Token creado y enviado en cookie para {user_email}")
+    
+    return page_response
+
+def compile_slip(currentBet: int, bets: list[BetItem]) -> tuple:
+    """
+    Validar la apuesta y compilarla contra la tabla del tapete (una búsqueda por apuesta).
+    currentBet es lo que se cobra: tiene que ser exactamente la suma de los montos apostados.
+    """
+    if currentBet < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Monto de apuesta inválido"
+        )
+    try:
+        payouts, total = compile_bets(bets)
+    except InvalidBet as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if currentBet != total:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El monto de la apuesta no coincide con las fichas apostadas"
+        )
+    return payouts
+
+async def play_spin(db: AsyncSession, user: UserSnapshot, currentBet: int, bets: list[BetItem]) -> dict:
+    """Un giro completo: validar, sortear, liquidar en BD y registrar en el historial (campos de SpinResponse)"""
+    payouts = compile_slip(currentBet, bets)
+
+    # Desde el sorteo hasta el historial el giro cuenta como en curso (el apagado lo espera)
+    with spins_in_flight:
+        # Generar número ganador aleatorio (0-36)
+        winningSpin = wheel_rng.spin()
     
-    return file_response
+        # Calcular ganancias: (odds * monto_apostado) de cada apuesta que cubre el número
+        winValue = payouts[winningSpin]
+
+        # Cobrar apuesta y abonar ganancia en un solo UPDATE ... RETURNING
+        new_balance = await settle_spin(
+            db,
+            user.id_usuario,
+            stake=Decimal(currentBet),
+            delta=Decimal(net_result(currentBet, winValue))
+        )
+
+        if new_balance is None:
+            if not await has_saldo(db, user.id_usuario):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Saldo no encontrado"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Saldo insuficiente"
+            )
 
-@app.post("/api/spin", response_model=SpinResponse)
-def api_spin(
-    req: SpinRequest,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+        metrics.record_spin(currentBet, winValue)
+
+        # Registrar la tirada en el historial (se escribe por lotes, fuera de la respuesta)
+        spin_ledger.record(
+            user.id_usuario,
+            [bet_item.model_dump() for bet_item in bets],
+            winningSpin,
+            Decimal(currentBet),
+            Decimal(winValue),
+            new_balance
+        )
+
+        return {
+            "winningSpin": winningSpin,
+            "winValue": winValue,
+            "newBalance": float(new_balance)
+        }
+
+@app.post(
+    "/api/spin",
+    response_model=SpinResponse,
+    responses={200: {"content": {"application/msgpack": {}}}},
+    openapi_extra=request_body_schema(SpinRequest)
+)
+async def api_spin(
+    request: Request,
+    req: SpinRequest = Depends(negotiated_body(SpinRequest)),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     API de SPIN con autenticación y actualización de saldo en BD
     Calcula ganancias basadas en todos los tipos de apuestas de la ruleta
+    Body y respuesta en JSON o MessagePack (Content-Type / Accept: application/msgpack)
+    """
+    return negotiated_response(request, await play_spin(db, current_user, req.currentBet, req.bets))
+
+@app.post("/api/spin/batch", response_model=BatchSpinResponse)
+async def api_spin_batch(
+    req: BatchSpinRequest,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Autoplay: varios giros con el mismo bet slip en una sola transacción.
+    Cada giro se calcula igual que /api/spin; se detiene sin saldo o al llegar a stopLoss/stopWin.
     """
     currentBet = req.currentBet
     bets = req.bets
-    numbersBet = req.numbersBet
+    payouts = compile_slip(currentBet, bets)
 
-    # Obtener saldo actual de la base de datos
-    saldo_obj = db.query(Saldo).filter(Saldo.id_usuario == current_user.id_usuario).first()
-    
-    if not saldo_obj:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Saldo no encontrado"
+    def play(balance):
+        results = play_spins(
+            payouts, currentBet, balance, wheel_rng.spin, req.spins,
+            stop_loss=req.stopLoss, stop_win=req.stopWin
         )
-    
-    saldo_actual = float(saldo_obj.saldo_actual)
+        return results, (results[-1][2] if results else balance)
 
-    # Validar saldo suficiente
-    if currentBet > saldo_actual:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Saldo insuficiente"
-        )
+    with spins_in_flight:
+        results = await settle_batch(db, current_user.id_usuario, play)
 
-    # Generar número ganador aleatorio (0-36)
-    winningSpin = random.randint(0, 36)
-    
-    # Calcular ganancias
-    winValue = 0
-    if winningSpin in numbersBet:
-        for bet_item in bets:
-            numArray = [int(x.strip()) for x in bet_item.numbers.split(',')]
-            if winningSpin in numArray:
-                # Ganancia = (odds * monto_apostado) + monto_apostado
-                winValue += (bet_item.odds * bet_item.amt)
-    
-    # Calcular nuevo saldo: saldo_actual - apuesta_total + ganancias
-    new_balance = saldo_actual - currentBet + winValue
-    if winValue > 0:
-        new_balance += currentBet  # Devolver la apuesta también si ganó
-
-    # Actualizar saldo en la base de datos
-    saldo_obj.saldo_actual = Decimal(str(new_balance))
-    db.commit()
-    db.refresh(saldo_obj)
-
-    return SpinResponse(
-        winningSpin=winningSpin,
-        winValue=winValue,
-        newBalance=float(saldo_obj.saldo_actual)
+        if results is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Saldo no encontrado"
+            )
+        if not results:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Saldo insuficiente"
+            )
+
+        apuestas = [bet_item.model_dump() for bet_item in bets]
+        for winningSpin, winValue, balance in results:
+            metrics.record_spin(currentBet, winValue)
+            spin_ledger.record(
+                current_user.id_usuario, apuestas, winningSpin,
+                Decimal(currentBet), Decimal(winValue), balance
+            )
+
+    return FastJSONResponse({
+        "winningSpins": [r[0] for r in results],
+        "winValues": [r[1] for r in results],
+        "balances": [float(r[2]) for r in results],
+        "newBalance": float(results[-1][2])
+    })
+
+# ========== ESTADÍSTICAS ==========
+
+@app.get("/api/leaderboard", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    tipo: Literal["saldo", "ganancia"] = "ganancia",
+    limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Top de saldos o de mayores ganancias en un giro (desde memoria, sin recorrer tablas)"""
+    best = await player_stats.leaderboard(tipo, limit)
+    return LeaderboardResponse(
+        tipo=tipo,
+        jugadores=[
+            LeaderboardEntry(posicion=i, nombre=nombre, valor=float(valor))
+            for i, (nombre, valor) in enumerate(best, start=1)
+        ]
     )
 
+@app.get("/api/stats", response_model=StatsResponse)
+async def get_stats(current_user: UserSnapshot = Depends(get_current_user)):
+    """Estadísticas acumuladas del usuario autenticado"""
+    player = player_stats.player(current_user.id_usuario)
+    if player is None:
+        return StatsResponse(giros=0, totalApostado=0, totalGanado=0, mayorGanancia=0, numerosFavoritos=[])
+    return StatsResponse(
+        giros=player.giros,
+        totalApostado=float(player.total_apostado),
+        totalGanado=float(player.total_ganado),
+        mayorGanancia=float(player.mayor_ganancia),
+        numerosFavoritos=player.favoritos()
+    )
+
+# ========== ADMINISTRACIÓN ==========
+
+CSV_BODY = {"requestBody": {"required": True, "content": {"text/csv": {"schema": {"type": "string"}}}}}
+
+@app.post("/api/admin/usuarios", openapi_extra=CSV_BODY)
+async def admin_import_users(request: Request, admin: UserSnapshot = Depends(get_current_admin)):
+    """
+    Alta masiva de jugadores. Body: CSV nombre,apellido,curp,email,password[,saldo]
+    Se lee como stream; para archivos muy grandes conviene: python onboarding.py usuarios
+    """
+    print(f"👤 Alta masiva iniciada por {admin.email}")
+    try:
+        return FastJSONResponse(await import_users(request.stream()))
+    except BulkError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.post("/api/admin/abonos", openapi_extra=CSV_BODY)
+async def admin_apply_credits(request: Request, admin: UserSnapshot = Depends(get_current_admin)):
+    """Abonos (o cargos) de saldo en lote. Body: CSV email,monto"""
+    print(f"💰 Abonos masivos iniciados por {admin.email}")
+    try:
+        return FastJSONResponse(await apply_credits(request.stream()))
+    except BulkError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# ========== SONDAS ==========
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: el proceso y el event loop responden (no toca la BD)"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: arranque completo y BD alcanzable (chequeo en caché unos segundos)"""
+    error = "iniciando" if "startup" not in startup_times else await database_ready()
+    ready = error is None
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "db": error or "ok", "pool": pool_status()},
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+# ========== MÉTRICAS ==========
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ========== WEBSOCKET DEL JUEGO ==========
+
+async def _ws_writer(websocket: WebSocket, outbox: asyncio.Queue):
+    """Enviar mensajes de la cola en orden; la cola acotada frena al lector si el cliente no lee"""
+    while True:
+        message = await outbox.get()
+        # Las difusiones de mesa llegan ya serializadas (una vez para todos)
+        await websocket.send_text(message if isinstance(message, str) else json.dumps(message))
+
+class _WriterGone(Exception):
+    """El escritor del WebSocket terminó (cliente desconectado o error al enviar)"""
+
+async def _ws_until_writer(writer: asyncio.Task, aw, timeout=None):
+    """
+    Esperar 'aw' mientras el escritor siga vivo: si send_text falla, el lector
+    no debe quedarse bloqueado en receive ni en una cola llena que nadie vacía.
+    """
+    task = asyncio.ensure_future(aw)
+    done, _ = await asyncio.wait((task, writer), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    if task in done:
+        return task.result()
+    task.cancel()
+    if writer in done:
+        raise _WriterGone()
+    raise asyncio.TimeoutError()
+
+async def _ws_handle(user: UserSnapshot, message, outbox: asyncio.Queue, state: dict) -> dict:
+    """Procesar un mensaje del cliente y devolver la respuesta"""
+    kind = message.get("type") if isinstance(message, dict) else None
+    try:
+        if kind == "join":
+            table = tables.get(message.get("table"))
+            if table is None:
+                return {"type": "error", "status": 404, "detail": "Mesa no encontrada"}
+            if state.get("table"):
+                state["table"].leave(outbox)
+            table.join(user.id_usuario, outbox)
+            state["table"] = table
+            return {"type": "joined", "table": table.name, "round": table.round}
+        if kind == "leave":
+            if state.get("table"):
+                state.pop("table").leave(outbox)
+            return {"type": "left"}
+        if kind == "bet":
+            table = state.get("table")
+            if table is None:
+                return {"type": "error", "status": 400, "detail": "Únete a una mesa primero"}
+            req = WsSpinMessage.model_validate(message)
+            payouts = compile_slip(req.currentBet, req.bets)
+            round_id = table.place_bet(
+                user.id_usuario, req.currentBet, payouts,
+                [bet_item.model_dump() for bet_item in req.bets]
+            )
+            if round_id is None:
+                return {"type": "error", "status": 400, "detail": "Límite de apuestas por ronda alcanzado"}
+            return {"type": "bet_accepted", "table": table.name, "round": round_id}
+        if kind == "spin":
+            req = WsSpinMessage.model_validate(message)
+            async with SessionLocal() as db:
+                result = await play_spin(db, user, req.currentBet, req.bets)
+            return {"type": "spin", **result}
+        if kind == "saldo":
+            async with SessionLocal() as db:
+                saldo = await get_balance(db, user.id_usuario)
+            if saldo is None:
+                return {"type": "error", "status": 404, "detail": "Saldo no encontrado"}
+            return {"type": "saldo", "saldo": float(saldo)}
+        if kind == "ping":
+            return {"type": "pong"}
+        return {"type": "error", "status": 400, "detail": "Mensaje desconocido"}
+    except HTTPException as e:
+        return {"type": "error", "status": e.status_code, "detail": e.detail}
+    except ValidationError as e:
+        return {"type": "error", "status": 422, "detail": e.errors(include_url=False, include_context=False)}
+
+@app.websocket("/ws/game")
+async def ws_game(websocket: WebSocket):
+    """
+    Canal persistente del juego: autentica una vez (Header o Cookie, igual que
+    get_current_user) y luego acepta mensajes {"type": "spin" | "saldo" | "ping"}.
+    Modo mesa: "join" / "bet" / "leave"; los resultados de cada ronda llegan por push.
+    """
+    async with SessionLocal() as db:
+        try:
+            user = await authenticate(websocket, db)
+        except HTTPException as e:
+            await websocket.close(code=1008, reason=e.detail)
+            return
+
+    await websocket.accept()
+    outbox = asyncio.Queue(maxsize=WS_MAX_PENDING)
+    writer = asyncio.create_task(_ws_writer(websocket, outbox))
+    state = {}
+    try:
+        while True:
+            try:
+                raw = await _ws_until_writer(writer, websocket.receive_text(), WS_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Inactividad")
+                break
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                reply = {"type": "error", "status": 400, "detail": "JSON inválido"}
+            else:
+                reply = await _ws_handle(user, message, outbox, state)
+            await _ws_until_writer(writer, outbox.put(reply))
+    except (WebSocketDisconnect, _WriterGone):
+        pass
+    finally:
+        if state.get("table"):
+            state["table"].leave(outbox)
+        writer.cancel()
+        if writer.done() and not writer.cancelled():
+            error = writer.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"❌ Error enviando por WebSocket a {user.email}: {error!r}")
+                try:
+                    await websocket.close(code=1011)
+                except Exception:
+                    pass
+
 # ========== STARTUP ==========
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     """Verificar conexión a base de datos al iniciar"""
     print("🚀 Iniciando aplicación...")
-    test_connection()
+    app.state.index_page = CachedPage(INDEX_PATH)
+    log_pool_config()
+    warm_up_auth()
+    if await test_connection():
+        # Conexiones abiertas de antemano: los primeros requests no pagan el connect
+        print(f"🔥 Pool precalentado con {await warm_up_pool()} conexiones")
+    await hot_balances.start()
+    await player_stats.start()
+    spin_ledger.start()
+    for table in tables.values():
+        table.start()
+    startup_times["startup"] = time.perf_counter() - IMPORT_STARTED
+    print(f"⏱️ Arranque completo en {startup_times['startup'] * 1000:.0f} ms "
+          f"(import {startup_times['import'] * 1000:.0f} ms)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Esperar los giros en curso, detener las mesas y escribir el historial pendiente antes de salir"""
+    if spins_in_flight.count:
+        print(f"⏳ Esperando {spins_in_flight.count} giro(s) en curso...")
+        if not await spins_in_flight.wait(DRAIN_TIMEOUT):
+            print(f"⚠️ {spins_in_flight.count} giro(s) siguen en curso tras {DRAIN_TIMEOUT:g}s")
+    for table in tables.values():
+        await table.stop()
+    await spin_ledger.stop()
+    await player_stats.stop()
+    await hot_balances.stop()
+
+startup_times["import"] = time.perf_counter() - IMPORT_STARTED
 
+# Un solo proceso (desarrollo); en producción: python server.py (varios workers)
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
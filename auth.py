@@ -1,16 +1,43 @@
+import asyncio
+import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
-from models import Usuario
+from models import Rol, Usuario
+from cache import TTLCache
+from metrics import DECODE_TOKEN, VERIFY_PASSWORD
 
 # Usar Argon2 para hashear passwords (compatible con otros sistemas)
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Costos configurables; los hashes con otros parámetros se re-hashean al hacer login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB (64 MiB)
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# Pool dedicado para Argon2 (argon2-cffi libera el GIL): no ocupa el threadpool de
+# las requests y limita la memoria a HASH_WORKERS * ARGON2_MEMORY_COST
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+_hash_inflight = 0
 
 SECRET_KEY = os.getenv("JWT_SECRET", "tu-secret-key-super-segura")
 ALGORITHM = "HS256"
@@ -18,6 +45,32 @@ ACCESS_TOKEN_EXPIRE_DAYS = 7
 
 security = HTTPBearer(auto_error=False)
 
+# Nombre del rol con acceso a /api/admin (tabla rol)
+ADMIN_ROLE = "admin"
+
+# Caché de usuarios autenticados (por proceso): id_usuario -> UserSnapshot
+# El TTL acota cuánto tarda otro worker en ver una desactivación
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+class UserSnapshot(NamedTuple):
+    """Copia inmutable y ligera de los datos de Usuario que usan los endpoints"""
+    id_usuario: int
+    nombre: str
+    apellido: str
+    email: str
+    activo: bool
+
+    @classmethod
+    def from_model(cls, user: Usuario) -> "UserSnapshot":
+        return cls(user.id_usuario, user.nombre, user.apellido, user.email, bool(user.activo))
+
+_user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# Caché de tokens ya verificados: sha256(token) -> payload, válido hasta su "exp"
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+_token_cache = TTLCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_DAYS * 24 * 3600)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar password hasheado con Argon2"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -26,6 +79,42 @@ def get_password_hash(password: str) -> str:
     """Hashear password con Argon2"""
     return pwd_context.hash(password)
 
+def warm_up():
+    """Cargar los backends de JWT y Argon2 antes del primer request (sin hashear nada)"""
+    token = jwt.encode({"sub": "0"}, SECRET_KEY, algorithm=ALGORITHM)
+    jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    pwd_context.handler("argon2").get_backend()
+
+async def _run_in_hash_pool(fn, *args):
+    """Ejecutar fn en el pool de Argon2; 503 si la cola está llena"""
+    global _hash_inflight
+    if _hash_inflight >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta de nuevo",
+            headers={"Retry-After": "1"}
+        )
+    _hash_inflight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_inflight -= 1
+
+async def check_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar password en el pool de Argon2.
+    Devuelve (válido, nuevo_hash); nuevo_hash no es None si los parámetros cambiaron.
+    """
+    start = time.perf_counter()
+    try:
+        return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+    finally:
+        VERIFY_PASSWORD.observe(time.perf_counter() - start)
+
+async def hash_password(password: str) -> str:
+    """Hashear password en el pool de Argon2"""
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
 def create_access_token(data: dict) -> str:
     """Crear token JWT con expiración de 7 días"""
     to_encode = data.copy()
@@ -35,33 +124,74 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 def decode_token(token: str) -> Optional[dict]:
-    """Decodificar y validar token JWT"""
+    """
+    Decodificar y validar token JWT.
+    Un token ya verificado se sirve desde caché hasta su "exp" sin pasar por jose;
+    un token alterado tiene otro digest y siempre se verifica completo.
+    """
+    start = time.perf_counter()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        key = hashlib.sha256(token.encode()).digest()
+        payload = _token_cache.get(key)
+        if payload is not None:
+            return payload
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+
+        exp = payload.get("exp")
+        if exp is not None:
+            _token_cache.set(key, payload, ttl=exp - time.time())
         return payload
-    except JWTError:
+    finally:
+        DECODE_TOKEN.observe(time.perf_counter() - start)
+
+def invalidate_user(id_usuario: int) -> None:
+    """Quitar un usuario de la caché (p. ej. tras desactivarlo o cambiar sus datos)"""
+    _user_cache.pop(id_usuario)
+
+async def deactivate_user(db: AsyncSession, id_usuario: int) -> None:
+    """Desactivar un usuario y expulsarlo de la caché de este proceso"""
+    await db.execute(
+        update(Usuario).where(Usuario.id_usuario == id_usuario).values(activo=False)
+    )
+    await db.commit()
+    invalidate_user(id_usuario)
+
+async def load_user(db: AsyncSession, id_usuario: int) -> Optional[UserSnapshot]:
+    """Obtener el usuario desde la caché o, si no está, desde la BD"""
+    user = _user_cache.get(id_usuario)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(Usuario).where(Usuario.id_usuario == id_usuario))
+    row = result.scalars().first()
+    if row is None:
         return None
 
+    user = UserSnapshot.from_model(row)
+    _user_cache.set(id_usuario, user)
+    return user
+
 # CLAVE: Función que acepta token desde Header O Cookie
-def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db)
-) -> Usuario:
+async def authenticate(conn: HTTPConnection, db: AsyncSession) -> UserSnapshot:
     """
-    Autenticación híbrida:
+    Autenticación híbrida (sirve para requests HTTP y WebSockets):
     1. Busca token en Header Authorization (login web tradicional)
     2. Si no existe, busca en Cookie access_token (App Inventor)
     """
     token = None
     
     # Opción 1: Leer del Header Authorization: Bearer <token>
-    auth_header = request.headers.get("Authorization")
+    auth_header = conn.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
     
     # Opción 2: Leer de Cookie (Para App Inventor)
     if not token:
-        token = request.cookies.get("access_token")
+        token = conn.cookies.get("access_token")
 
     if not token:
         raise HTTPException(status_code=401, detail="No autenticado")
@@ -74,9 +204,33 @@ def get_current_user(
     if user_id is None:
         raise HTTPException(status_code=401, detail="Token sin ID")
     
-    # Buscar usuario en BD
-    user = db.query(Usuario).filter(Usuario.id_usuario == int(user_id)).first()
+    # Buscar usuario (caché por proceso, BD solo si no está)
+    user = await load_user(db, int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    if not user.activo:
+        raise HTTPException(status_code=401, detail="Usuario inactivo")
         
     return user
+
+async def get_current_user(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+) -> UserSnapshot:
+    """Dependency de FastAPI para endpoints HTTP autenticados"""
+    return await authenticate(request, db)
+
+async def get_current_admin(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+) -> UserSnapshot:
+    """Dependency para endpoints de administración: 403 si el usuario no tiene el rol admin"""
+    user = await authenticate(request, db)
+    # Sin caché: el rol se consulta en cada request de administración (son pocos)
+    result = await db.execute(
+        select(Rol.nombre).join(Usuario, Usuario.id_rol == Rol.id_rol)
+        .where(Usuario.id_usuario == user.id_usuario)
+    )
+    if result.scalar_one_or_none() != ADMIN_ROLE:
+        raise HTTPException(status_code=403, detail="Requiere rol de administrador")
+    return user
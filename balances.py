@@ -0,0 +1,352 @@
+# balances.py - Saldos activos en memoria con journal durable y write-behind a la tabla saldo
+import asyncio
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from database import SessionLocal, is_row_error
+from models import Saldo
+
+# "memory" activa la capa; vacío = cada giro va directo a PostgreSQL (comportamiento original)
+BALANCE_STORE = os.getenv("BALANCE_STORE", "").lower()
+BALANCE_JOURNAL = os.getenv("BALANCE_JOURNAL", "saldo.journal")
+BALANCE_JOURNAL_FSYNC = os.getenv("BALANCE_JOURNAL_FSYNC", "true").lower() in ("1", "true", "yes")
+BALANCE_JOURNAL_COMPACT_BYTES = int(os.getenv("BALANCE_JOURNAL_COMPACT_BYTES", str(1 << 20)))
+BALANCE_FLUSH_MS = int(os.getenv("BALANCE_FLUSH_MS", "500"))
+BALANCE_IDLE_SECONDS = float(os.getenv("BALANCE_IDLE_SECONDS", "900"))
+
+if BALANCE_STORE not in ("", "memory"):
+    raise ValueError(f"BALANCE_STORE no soportado: {BALANCE_STORE!r} (usa 'memory' o déjalo vacío)")
+
+_SALDO = Saldo.__table__
+# ids por consulta al cargar saldos que no están en memoria (credit_many)
+_LOAD_CHUNK = 10_000
+# Máximo que cabe en saldo_actual NUMERIC(10, 2): en la BD un UPDATE que lo pasa falla
+_SALDO_TYPE = _SALDO.c.saldo_actual.type
+MAX_SALDO = Decimal(10) ** (_SALDO_TYPE.precision - _SALDO_TYPE.scale) - Decimal(1).scaleb(-_SALDO_TYPE.scale)
+_PERSIST = (
+    update(_SALDO)
+    .where(_SALDO.c.id_usuario == bindparam("uid"))
+    .values(saldo_actual=bindparam("saldo"))
+)
+
+class BalanceJournal:
+    """
+    Archivo append-only con el saldo absoluto tras cada cambio ("id saldo" por línea).
+    Los cambios concurrentes se agrupan en una sola escritura + fsync (group commit).
+    Reproducirlo es idempotente: gana la última línea de cada usuario.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+        self._pending = []
+        self._waiter = None
+        self._flusher = None
+        self._lock = asyncio.Lock()
+
+    def open(self):
+        self._file = open(self.path, "ab")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def size(self) -> int:
+        return self._file.tell() if self._file is not None else 0
+
+    def read(self) -> dict:
+        """Último saldo por usuario; una línea incompleta (caída a mitad de escritura) se ignora"""
+        latest = {}
+        if not os.path.exists(self.path):
+            return latest
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    id_usuario, saldo = line.split()
+                    latest[int(id_usuario)] = Decimal(saldo.decode())
+                except (ValueError, InvalidOperation):
+                    continue
+        return latest
+
+    def write(self, id_usuario: int, saldo: Decimal):
+        """Encolar una línea; sync() la hace durable"""
+        self._pending.append(f"{id_usuario} {saldo}\n".encode())
+
+    async def sync(self):
+        """Esperar a que todo lo encolado hasta ahora esté escrito (y con fsync)"""
+        if not self._pending:
+            return
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        waiter = self._waiter
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        await asyncio.shield(waiter)
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    async def _flush(self):
+        while self._pending:
+            data = b"".join(self._pending)
+            self._pending = []
+            waiter, self._waiter = self._waiter, None
+            async with self._lock:
+                try:
+                    await asyncio.to_thread(self._write, data)
+                except Exception as e:
+                    self._pending[:0] = [data]
+                    if waiter is not None and not waiter.done():
+                        waiter.set_exception(e)
+                    return
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+    def _rewrite(self, data: bytes):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+
+    async def compact(self, state: dict):
+        """Reemplazar el journal por 'state' (los saldos aún no persistidos en la BD)"""
+        async with self._lock:
+            data = b"".join(f"{id_usuario} {saldo}\n".encode() for id_usuario, saldo in state.items())
+            await asyncio.to_thread(self._rewrite, data)
+
+class HotBalanceStore:
+    """
+    Saldos de los jugadores activos en memoria. Los débitos y créditos son atómicos
+    porque leer y escribir ocurre sin await de por medio en el event loop; cada cambio
+    se confirma en el journal antes de responder y se persiste a saldo por lotes
+    ordenados por id_usuario (write-behind).
+
+    Esta capa es dueña de saldo_actual mientras está activa: todas las escrituras deben
+    pasar por wallet.py y se debe correr un solo proceso (workers=1).
+    """
+
+    def __init__(self, enabled=BALANCE_STORE == "memory", journal_path=BALANCE_JOURNAL,
+                 session_factory=SessionLocal, flush_ms=BALANCE_FLUSH_MS,
+                 idle_seconds=BALANCE_IDLE_SECONDS, fsync=BALANCE_JOURNAL_FSYNC,
+                 compact_bytes=BALANCE_JOURNAL_COMPACT_BYTES):
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self.flush_interval = flush_ms / 1000
+        self.idle_seconds = idle_seconds
+        self.compact_bytes = compact_bytes
+        self.journal = BalanceJournal(journal_path, fsync=fsync)
+        self.balances = {}    # id_usuario -> Decimal
+        self.last_used = {}   # id_usuario -> time.monotonic()
+        self.dirty = {}       # id_usuario -> saldo pendiente de persistir
+        self.failing = set()  # id_usuario cuya fila falló al persistir: se escriben aparte
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+    # ----- lectura -----
+
+    async def _load(self, db: AsyncSession, id_usuario: int) -> Optional[Decimal]:
+        balance = self.balances.get(id_usuario)
+        if balance is None:
+            stmt = select(Saldo.saldo_actual).where(Saldo.id_usuario == id_usuario)
+            loaded = (await db.execute(stmt)).scalar_one_or_none()
+            if loaded is None:
+                return None
+            # Otra corrutina pudo cargarlo (y modificarlo) mientras esperábamos a la BD
+            balance = self.balances.setdefault(id_usuario, loaded)
+        self.last_used[id_usuario] = time.monotonic()
+        return balance
+
+    async def get(self, db: AsyncSession, id_usuario: int) -> Optional[Decimal]:
+        return await self._load(db, id_usuario)
+
+    # ----- escritura -----
+
+    def _apply(self, id_usuario: int, stake: Decimal, delta: Decimal) -> Optional[Decimal]:
+        """
+        Cobro condicional en memoria (sin await): None si no alcanza el saldo o si el
+        resultado no cabe en saldo_actual (el mismo UPDATE fallaría en la BD)
+        """
+        balance = self.balances[id_usuario]
+        if balance < stake or balance + delta > MAX_SALDO:
+            return None
+        if delta:
+            balance = balance + delta
+            self.balances[id_usuario] = balance
+            self.dirty[id_usuario] = balance
+            self.journal.write(id_usuario, balance)
+        return balance
+
+    async def settle(self, db: AsyncSession, id_usuario: int, stake: Decimal, delta: Decimal) -> Optional[Decimal]:
+        if await self._load(db, id_usuario) is None:
+            return None
+        new_balance = self._apply(id_usuario, stake, delta)
+        await self.journal.sync()
+        return new_balance
+
+    async def settle_batch(self, db: AsyncSession, id_usuario: int, play) -> Optional[list]:
+        if await self._load(db, id_usuario) is None:
+            return None
+        balance = self.balances[id_usuario]
+        results, final_balance = play(balance)
+        if self._apply(id_usuario, Decimal(0), final_balance - balance) is None:
+            # El saldo final no cabe en la columna: no se juega ningún giro
+            return []
+        await self.journal.sync()
+        return results
+
+    async def settle_round(self, db: AsyncSession, rows: list) -> dict:
+        for id_usuario, _, _ in rows:
+            await self._load(db, id_usuario)
+        balances = {}
+        for id_usuario, stake, delta in rows:
+            if id_usuario in self.balances:
+                new_balance = self._apply(id_usuario, stake, delta)
+                if new_balance is not None:
+                    balances[id_usuario] = new_balance
+        await self.journal.sync()
+        return balances
+
+    async def credit_many(self, db: AsyncSession, credits: dict) -> dict:
+        """
+        Abonos masivos {id_usuario: monto}: carga en una consulta los que no están en memoria.
+        Un monto negativo que no alcanza el saldo no se aplica (None en el resultado).
+        """
+        missing = [id_usuario for id_usuario in credits if id_usuario not in self.balances]
+        # Por tramos: un IN con todos los ids de un archivo grande pasaría el límite de parámetros
+        for i in range(0, len(missing), _LOAD_CHUNK):
+            stmt = select(Saldo.id_usuario, Saldo.saldo_actual).where(
+                Saldo.id_usuario.in_(missing[i:i + _LOAD_CHUNK])
+            )
+            for id_usuario, loaded in await db.execute(stmt):
+                self.balances.setdefault(id_usuario, loaded)
+        now = time.monotonic()
+        applied = {}
+        for id_usuario, monto in credits.items():
+            if id_usuario in self.balances:
+                self.last_used[id_usuario] = now
+                applied[id_usuario] = self._apply(id_usuario, max(-monto, Decimal(0)), monto)
+        await self.journal.sync()
+        return applied
+
+    # ----- write-behind -----
+
+    async def _persist(self, state: dict):
+        rows = [{"uid": id_usuario, "saldo": state[id_usuario]} for id_usuario in sorted(state)]
+        async with self.session_factory() as db:
+            await db.execute(_PERSIST, rows)
+            await db.commit()
+
+    async def _persist_isolating(self, state: dict) -> dict:
+        """
+        Persistir 'state' y devolver lo que no se pudo escribir. Si el lote falla por los
+        datos de alguna fila, se escribe fila por fila: una fila mala no frena a las demás.
+        Las que ya fallaron antes van siempre aparte.
+        """
+        suspect = {i: b for i, b in state.items() if i in self.failing}
+        rest = {i: b for i, b in state.items() if i not in self.failing}
+        if rest:
+            try:
+                await self._persist(rest)
+            except Exception as e:
+                if not is_row_error(e):
+                    # BD caída u otro error general: todo se reintenta en el siguiente ciclo
+                    print(f"❌ Error persistiendo saldos en memoria: {e}")
+                    return state
+                suspect.update(rest)
+        failed = {}
+        for id_usuario in sorted(suspect):
+            try:
+                await self._persist({id_usuario: suspect[id_usuario]})
+                self.failing.discard(id_usuario)
+            except Exception as e:
+                if id_usuario not in self.failing:
+                    print(f"❌ No se pudo persistir el saldo {suspect[id_usuario]} de {id_usuario}: {e}")
+                self.failing.add(id_usuario)
+                failed[id_usuario] = suspect[id_usuario]
+        return failed
+
+    async def flush(self):
+        """Persistir los saldos modificados; lo que falle se reintenta en el siguiente ciclo"""
+        if self.dirty:
+            snapshot, self.dirty = self.dirty, {}
+            for id_usuario, balance in (await self._persist_isolating(snapshot)).items():
+                self.dirty.setdefault(id_usuario, balance)
+        # Compactar con lo pendiente es seguro aunque algo haya fallado: dirty lo conserva
+        if self.journal.size() > self.compact_bytes:
+            await self.journal.compact(self.dirty)
+        self._evict()
+
+    def _evict(self):
+        """Olvidar jugadores inactivos ya persistidos (se recargan de la BD al volver)"""
+        cutoff = time.monotonic() - self.idle_seconds
+        for id_usuario in [i for i, t in self.last_used.items() if t < cutoff and i not in self.dirty]:
+            del self.last_used[id_usuario]
+            self.balances.pop(id_usuario, None)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def recover(self):
+        """Aplicar a la BD lo que quedó en el journal tras una caída y vaciarlo"""
+        pending = self.journal.read()
+        if pending:
+            failed = await self._persist_isolating(pending)
+            print(f"♻️ Recuperados {len(pending) - len(failed)} saldos desde {self.journal.path}")
+            # Lo que no se pudo escribir sigue en memoria (el journal manda) y pendiente
+            now = time.monotonic()
+            for id_usuario, balance in failed.items():
+                self.balances[id_usuario] = self.dirty[id_usuario] = balance
+                self.last_used[id_usuario] = now
+        self.journal.open()
+        await self.journal.compact(self.dirty)
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        await self.recover()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Persistir todo y dejar el journal vacío"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.journal.sync()
+        await self.flush()
+        if not self.dirty:
+            await self.journal.compact({})
+        self.journal.close()
+
+hot_balances = HotBalanceStore()
+
+if hot_balances.enabled:
+    metrics.gauge("ruleta_hot_balances", "Saldos en memoria", lambda: len(hot_balances.balances))
+    metrics.gauge("ruleta_hot_balances_dirty", "Saldos pendientes de persistir", lambda: len(hot_balances.dirty))
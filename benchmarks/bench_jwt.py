@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de decode_token: verificación completa con jose vs caché de tokens
+Ejecuta: python benchmarks/bench_jwt.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+
+from jose import jwt
+import auth
+
+N = 20000
+
+def main():
+    token = auth.create_access_token({"sub": "1", "email": "bench@example.com"})
+
+    def jose_decode():
+        jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+    def cached_decode():
+        auth.decode_token(token)
+
+    auth.decode_token(token)  # llenar la caché
+
+    t_jose = timeit.timeit(jose_decode, number=N) / N
+    t_cache = timeit.timeit(cached_decode, number=N) / N
+
+    print("=" * 60)
+    print("BENCHMARK JWT DECODE")
+    print("=" * 60)
+    print(f"jose.decode:          {t_jose * 1e6:8.2f} µs/token")
+    print(f"decode_token (caché): {t_cache * 1e6:8.2f} µs/token")
+    print(f"Ahorro por request:   {(t_jose - t_cache) * 1e6:8.2f} µs ({t_jose / t_cache:.1f}x)")
+
+if __name__ == "__main__":
+    main()
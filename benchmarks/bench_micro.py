@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks del camino caliente: motor de pagos, JWT, Argon2 y serialización
+Ejecuta: python benchmarks/bench_micro.py [--quick] [--output archivo.json]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+
+from fastapi.encoders import jsonable_encoder
+from jose import jwt
+from starlette.responses import JSONResponse
+import auth
+from app import SpinResponse
+from serialization import FastJSONResponse, MsgPackResponse
+from rng import wheel_rng
+from roulette import compile_bets, net_result, play_spins
+from results import save_results
+
+# Bet slip típico del frontend: un pleno, un split y una apuesta exterior
+SLIP = [
+    SimpleNamespace(amt=5, type="inside_whole", odds=35, numbers="17"),
+    SimpleNamespace(amt=5, type="inside_split", odds=17, numbers="1, 2"),
+    SimpleNamespace(amt=10, type="outside_oerb", odds=1,
+                    numbers="1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36"),
+]
+STAKE = sum(bet.amt for bet in SLIP)
+
+def measure(fn, number, repeat=5) -> dict:
+    """Mejor de 'repeat' corridas (la menos afectada por ruido)"""
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    return {"us_per_op": best * 1e6, "ops_per_s": 1 / best}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks del servidor de la ruleta")
+    parser.add_argument("--quick", action="store_true", help="Menos iteraciones (para CI)")
+    parser.add_argument("--output", help="Ruta del JSON (por defecto benchmarks/results/micro-<commit>.json)")
+    args = parser.parse_args(argv)
+    scale = 10 if args.quick else 1
+
+    payouts, _ = compile_bets(SLIP)
+    token = auth.create_access_token({"sub": "1", "email": "bench@example.com"})
+    password_hash = auth.pwd_context.hash("bench")
+    auth.decode_token(token)  # llenar la caché
+
+    def spin_once():
+        win = payouts[wheel_rng.spin()]
+        net_result(STAKE, win)
+
+    spin = {"winningSpin": 17, "winValue": 180, "newBalance": 1234.5}
+
+    def spin_response_default():
+        # Lo que hace FastAPI con response_model: validar, jsonable_encoder y json.dumps
+        JSONResponse(jsonable_encoder(SpinResponse.model_validate(spin)))
+
+    cases = {
+        "payout_compile_slip": (lambda: compile_bets(SLIP), 100_000),
+        "payout_spin": (spin_once, 500_000),
+        "payout_play_100_spins": (lambda: play_spins(payouts, STAKE, 10**9, wheel_rng.spin, 100), 5_000),
+        "jwt_encode": (lambda: auth.create_access_token({"sub": "1", "email": "bench@example.com"}), 10_000),
+        "jwt_decode_jose": (lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), 10_000),
+        "jwt_decode_cached": (lambda: auth.decode_token(token), 200_000),
+        "spin_response_default": (spin_response_default, 100_000),
+        "spin_response_orjson": (lambda: FastJSONResponse(spin), 100_000),
+        "spin_response_msgpack": (lambda: MsgPackResponse(spin), 100_000),
+        "argon2_verify": (lambda: auth.pwd_context.verify("bench", password_hash), 20),
+    }
+
+    print("=" * 60)
+    print("MICRO-BENCHMARKS")
+    print("=" * 60)
+    results = {}
+    for name, (fn, number) in cases.items():
+        results[name] = measure(fn, max(1, number // scale), repeat=3 if name == "argon2_verify" else 5)
+        print(f"{name:24s} {results[name]['us_per_op']:12.2f} µs/op  {results[name]['ops_per_s']:14,.0f} op/s")
+    print("=" * 60)
+
+    save_results("micro", results, args.output)
+
+if __name__ == "__main__":
+    main()
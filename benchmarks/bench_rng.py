@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Benchmark del generador de números ganadores: random.randint vs WheelRNG (os.urandom con buffer)
+Ejecuta: python benchmarks/bench_rng.py
+"""
+
+import os
+import random
+import sys
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rng import WheelRNG
+
+N = 1_000_000
+
+def main():
+    rng = WheelRNG()
+    t_randint = timeit.timeit(lambda: random.randint(0, 36), number=N)
+    t_wheel = timeit.timeit(rng.spin, number=N)
+
+    print("=" * 60)
+    print("BENCHMARK RNG DE LA RUEDA")
+    print("=" * 60)
+    print(f"random.randint(0, 36): {N / t_randint / 1e6:6.2f} M giros/s")
+    print(f"WheelRNG.spin():       {N / t_wheel / 1e6:6.2f} M giros/s ({t_randint / t_wheel:.1f}x)")
+
+    # Chequeo rápido de uniformidad (chi-cuadrado, 36 grados de libertad)
+    counts = Counter(rng.spins(N))
+    expected = N / 37
+    chi2 = sum((counts[n] - expected) ** 2 / expected for n in range(37))
+    print(f"Chi-cuadrado (36 gl):  {chi2:.1f}  (esperado ~36, sospechoso > 67)")
+
+if __name__ == "__main__":
+    main()
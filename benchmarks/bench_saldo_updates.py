@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Throughput de UPDATE sobre saldo: esquema original vs. ajustado para updates HOT
+    antes:   fillfactor 100 y ultima_actualizacion enviada por el cliente en cada UPDATE
+    despues: fillfactor 70 y ultima_actualizacion calculada por el servidor (migración 0003)
+Mide updates/s, % de updates HOT y tamaño de tabla e índices tras la corrida.
+Usa tablas propias en el esquema bench_saldo (no toca saldo).
+
+Ejecuta: DATABASE_URL=postgresql://... python benchmarks/bench_saldo_updates.py [--seconds 10]
+Requiere PostgreSQL.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import _database_url
+from results import save_results
+
+SCHEMA = "bench_saldo"
+
+VARIANTS = {
+    "antes": {
+        "fillfactor": 100,
+        "update": """
+            UPDATE {table} SET saldo_actual = saldo_actual + :delta, ultima_actualizacion = :ahora
+            WHERE id_usuario = :id AND saldo_actual >= :stake RETURNING saldo_actual
+        """,
+    },
+    "despues": {
+        "fillfactor": 70,
+        "update": """
+            UPDATE {table} SET saldo_actual = saldo_actual + :delta, ultima_actualizacion = timezone('utc', now())
+            WHERE id_usuario = :id AND saldo_actual >= :stake RETURNING saldo_actual
+        """,
+    },
+}
+
+async def create_table(engine, name: str, fillfactor: int, rows: int):
+    table = f"{SCHEMA}.saldo_{name}"
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        await conn.execute(text(f"""
+            CREATE TABLE {table} (
+                id_saldo SERIAL PRIMARY KEY,
+                id_usuario INTEGER UNIQUE NOT NULL,
+                saldo_actual NUMERIC(10, 2) DEFAULT 500.00 NOT NULL,
+                ultima_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITH (fillfactor = {fillfactor})
+        """))
+        await conn.execute(text(
+            f"INSERT INTO {table} (id_usuario, saldo_actual) SELECT g, 1000000 FROM generate_series(1, :rows) g"
+        ), {"rows": rows})
+        await conn.execute(text(f"ANALYZE {table}"))
+    return table
+
+async def run_updates(engine, statement, players: int, concurrency: int, seconds: float) -> int:
+    """Cada tarea: un giro (UPDATE + commit) tras otro sobre jugadores al azar"""
+    stop_at = time.perf_counter() + seconds
+    done = 0
+
+    async def player_loop():
+        nonlocal done
+        async with engine.connect() as conn:
+            while time.perf_counter() < stop_at:
+                await conn.execute(statement, {
+                    "id": random.randint(1, players), "stake": 10, "delta": random.choice((-10, 10)),
+                    "ahora": datetime.utcnow(),
+                })
+                await conn.commit()
+                done += 1
+
+    await asyncio.gather(*(player_loop() for _ in range(concurrency)))
+    return done
+
+async def table_stats(engine, table: str) -> dict:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+        upd, hot = (await conn.execute(text(
+            "SELECT n_tup_upd, n_tup_hot_upd FROM pg_stat_user_tables WHERE relid = CAST(:t AS regclass)"
+        ), {"t": table})).one()
+        heap, indexes = (await conn.execute(text(
+            "SELECT pg_relation_size(CAST(:t AS regclass)), pg_indexes_size(CAST(:t AS regclass))"
+        ), {"t": table})).one()
+    return {"hot_pct": 100 * hot / upd if upd else 0.0,
+            "table_kb": heap // 1024, "indexes_kb": indexes // 1024}
+
+async def main_async(args):
+    url = _database_url()
+    if not url.startswith("postgresql"):
+        sys.exit("❌ Este benchmark requiere PostgreSQL (DATABASE_URL=postgresql://...)")
+
+    results = {"config": {"rows": args.rows, "players": args.players,
+                          "concurrency": args.concurrency, "seconds": args.seconds}}
+    for name, variant in VARIANTS.items():
+        engine = create_async_engine(url, pool_size=args.concurrency, max_overflow=0)
+        table = await create_table(engine, name, variant["fillfactor"], args.rows)
+        updates = await run_updates(engine, text(variant["update"].format(table=table)),
+                                    args.players, args.concurrency, args.seconds)
+        # Al cerrar las conexiones cada backend publica sus contadores en pg_stat
+        await engine.dispose()
+        await asyncio.sleep(1)
+        engine = create_async_engine(url)
+        results[name] = {"updates_per_s": updates / args.seconds, **await table_stats(engine, table)}
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE {table}"))
+        await engine.dispose()
+
+    print("=" * 60)
+    print("UPDATE DE SALDO (giros con commit)")
+    print("=" * 60)
+    for name in VARIANTS:
+        r = results[name]
+        print(f"{name:8s} {r['updates_per_s']:10,.0f} updates/s  HOT {r['hot_pct']:5.1f}%  "
+              f"tabla {r['table_kb']:,} KB  índices {r['indexes_kb']:,} KB")
+    print("=" * 60)
+    save_results("saldo-updates", results, args.output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput de UPDATE sobre saldo antes/después del ajuste HOT")
+    parser.add_argument("--rows", type=int, default=50_000, help="Filas de saldo")
+    parser.add_argument("--players", type=int, default=5_000, help="Jugadores activos (ids que se actualizan)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--keep", action="store_true", help="No borrar las tablas (para inspeccionarlas)")
+    parser.add_argument("--output", help="Ruta del JSON (por defecto benchmarks/results/saldo-updates-<commit>.json)")
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
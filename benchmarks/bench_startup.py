@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Arranque en frío: tiempo desde "import app" hasta la primera respuesta, en procesos nuevos
+Usa DATABASE_URL si está configurada; si no, SQLite en benchmarks/bench_load.db
+Ejecuta: python benchmarks/bench_startup.py [--runs 5] [--output archivo.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from results import save_results
+
+# Se ejecuta en un intérprete nuevo para que ningún módulo esté ya importado
+CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import app
+import httpx
+t_import = time.perf_counter()
+
+async def main():
+    async with app.app.router.lifespan_context(app.app):
+        t_startup = time.perf_counter()
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/readyz")
+        t_first = time.perf_counter()
+    return t_startup, t_first
+
+t_startup, t_first = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1e3,
+    "startup_ms": (t_startup - t0) * 1e3,
+    "first_request_ms": (t_first - t0) * 1e3,
+}))
+"""
+
+def run_once(env) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Ruta del JSON (por defecto benchmarks/results/startup-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(ROOT, "benchmarks", "bench_load.db"))
+
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    print("=" * 60)
+    print(f"ARRANQUE EN FRÍO ({args.runs} procesos, mediana)")
+    print("=" * 60)
+    results = {}
+    for key in ("import_ms", "startup_ms", "first_request_ms"):
+        values = [run[key] for run in runs]
+        results[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        print(f"{key:18s} {results[key]['median']:9.1f} ms  (min {results[key]['min']:.1f}, máx {results[key]['max']:.1f})")
+    print("=" * 60)
+
+    save_results("startup", results, args.output)
+
+if __name__ == "__main__":
+    main()
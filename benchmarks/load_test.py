@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de login, saldo y spin contra la app en proceso (httpx + ASGI)
+Usa DATABASE_URL si está configurada (PostgreSQL local); si no, SQLite en benchmarks/bench_load.db
+Crea usuarios bench<N>@loadtest.local (se borran y se vuelven a crear en cada corrida).
+
+Ejecuta: python benchmarks/load_test.py --users 50 --concurrency 16 --requests 2000
+Requiere: pip install httpx aiosqlite
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # app.py monta static/ y lee templates/ con rutas relativas
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(ROOT, "benchmarks", "bench_load.db"))
+# Todos los requests salen de la misma IP del cliente ASGI: sin esto el límite de login
+# por IP (ratelimit.py) corta la corrida en el intento 21
+os.environ.setdefault("LOGIN_RATE_IP", "1000000/1")
+os.environ.setdefault("LOGIN_RATE_EMAIL", "1000000/1")
+
+import httpx
+from sqlalchemy import delete, select
+
+from database import Base, SessionLocal, engine
+from models import EstadisticaJugador, EstadisticaNumero, Rol, Saldo, Tirada, Usuario
+from auth import pwd_context
+from app import app
+from results import save_results
+
+EMAIL_DOMAIN = "@loadtest.local"
+PASSWORD = "bench-password"
+INITIAL_BALANCE = 1_000_000
+
+SPIN_BODY = {
+    "balance": 0,
+    "currentBet": 10,
+    "bets": [{"amt": 10, "type": "outside_oerb", "odds": 1,
+              "numbers": "1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36"}],
+    "numbersBet": [],
+}
+
+async def seed_users(count: int) -> list:
+    """Crear el esquema si falta y dejar 'count' usuarios de prueba con saldo inicial"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    password_hash = pwd_context.hash(PASSWORD)  # un solo hash: Argon2 es caro a propósito
+    async with SessionLocal() as db:
+        bench_ids = select(Usuario.id_usuario).where(Usuario.email.like("bench%" + EMAIL_DOMAIN))
+        await db.execute(delete(Tirada).where(Tirada.id_usuario.in_(bench_ids)))
+        await db.execute(delete(EstadisticaNumero).where(EstadisticaNumero.id_usuario.in_(bench_ids)))
+        await db.execute(delete(EstadisticaJugador).where(EstadisticaJugador.id_usuario.in_(bench_ids)))
+        await db.execute(delete(Saldo).where(Saldo.id_usuario.in_(bench_ids)))
+        await db.execute(delete(Usuario).where(Usuario.email.like("bench%" + EMAIL_DOMAIN)))
+
+        id_rol = await db.scalar(select(Rol.id_rol).order_by(Rol.id_rol).limit(1))
+        if id_rol is None:
+            rol = Rol(nombre="jugador")
+            db.add(rol)
+            await db.flush()
+            id_rol = rol.id_rol
+
+        users = [
+            Usuario(id_rol=id_rol, nombre="Bench", apellido=str(i), curp=f"BENCH{i:013d}",
+                    email=f"bench{i}{EMAIL_DOMAIN}", password_hash=password_hash, activo=True)
+            for i in range(count)
+        ]
+        db.add_all(users)
+        await db.flush()
+        db.add_all(Saldo(id_usuario=user.id_usuario, saldo_actual=INITIAL_BALANCE) for user in users)
+        await db.commit()
+    return [user.email for user in users]
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[max(0, math.ceil(p * len(sorted_values)) - 1)]
+
+async def run_scenario(client, total: int, concurrency: int, make_request) -> dict:
+    """Lanzar 'total' requests con 'concurrency' workers; make_request(i) devuelve la corrutina"""
+    latencies = []
+    statuses = Counter()
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": total - statuses.get(200, 0),
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p90_ms": percentile(latencies, 0.90) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "max_ms": latencies[-1] * 1e3,
+        "mean_ms": sum(latencies) / total * 1e3,
+    }
+
+async def run(args) -> dict:
+    emails = await seed_users(args.users)
+
+    try:
+        async with app.router.lifespan_context(app):
+            return await _run_scenarios(args, emails)
+    finally:
+        await engine.dispose()
+
+async def _run_scenarios(args, emails: list) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        # Un login por usuario para obtener los tokens (también calienta cachés y pool)
+        tokens = []
+        for email in emails:
+            r = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+            r.raise_for_status()
+            tokens.append({"Authorization": "Bearer " + r.json()["token"]})
+
+        scenarios = {
+            "login": (args.login_requests, lambda i: client.post(
+                "/api/auth/login", json={"email": emails[i % len(emails)], "password": PASSWORD})),
+            "saldo": (args.requests, lambda i: client.get(
+                "/api/saldo", headers=tokens[i % len(tokens)])),
+            "spin": (args.requests, lambda i: client.post(
+                "/api/spin", headers=tokens[i % len(tokens)], json=SPIN_BODY)),
+        }
+
+        results = {}
+        for name in args.scenario or scenarios:
+            total, make_request = scenarios[name]
+            results[name] = await run_scenario(client, total, args.concurrency, make_request)
+            r = results[name]
+            print(f"{name:6s} {r['rps']:9.1f} req/s  p50 {r['p50_ms']:8.2f} ms  "
+                  f"p99 {r['p99_ms']:8.2f} ms  errores {r['errors']}")
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de la ruleta")
+    parser.add_argument("--users", type=int, default=50, help="Usuarios de prueba a crear")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests simultáneos")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests por escenario (saldo, spin)")
+    parser.add_argument("--login-requests", type=int, default=200, help="Requests de login (Argon2 es lento)")
+    parser.add_argument("--scenario", action="append", choices=("login", "saldo", "spin"),
+                        help="Escenario a ejecutar (repetible); por defecto todos")
+    parser.add_argument("--output", help="Ruta del JSON (por defecto benchmarks/results/load-<bd>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    backend = engine.dialect.name
+    print("=" * 60)
+    print(f"PRUEBA DE CARGA ({backend}, {args.users} usuarios, concurrencia {args.concurrency})")
+    print("=" * 60)
+    results = asyncio.run(run(args))
+    print("=" * 60)
+
+    results["config"] = {"users": args.users, "concurrency": args.concurrency}
+    save_results(f"load-{backend}", results, args.output)
+
+if __name__ == "__main__":
+    main()
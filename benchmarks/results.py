@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Resultados de benchmarks en JSON para comparar entre commits
+Guardar:  save_results("micro", {...})  ->  benchmarks/results/micro-<commit>.json
+Comparar: python benchmarks/results.py results/micro-abc123.json results/micro-def456.json
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def save_results(name: str, results: dict, path: str = None) -> str:
+    """Escribir {"meta": ..., "results": ...}; cada métrica es un dict de números"""
+    commit = git_commit()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{commit}.json")
+    data = {
+        "meta": {
+            "benchmark": name,
+            "commit": commit,
+            "fecha": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f"Resultados guardados en {path}")
+    return path
+
+def compare(old_path: str, new_path: str) -> None:
+    """Mostrar el cambio relativo de cada valor numérico común a ambos archivos"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print("=" * 72)
+    print(f"COMPARACIÓN {old['meta']['benchmark']}: {old['meta']['commit']} -> {new['meta']['commit']}")
+    print("=" * 72)
+    for case, values in new["results"].items():
+        before = old["results"].get(case)
+        if not before or case == "config":
+            continue
+        for key, value in values.items():
+            prev = before.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(prev, (int, float)) or not prev:
+                continue
+            print(f"{case + '.' + key:48s} {prev:12.2f} -> {value:12.2f}  ({(value - prev) / prev:+7.1%})")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python benchmarks/results.py ANTES.json DESPUES.json")
+        sys.exit(1)
+    compare(sys.argv[1], sys.argv[2])
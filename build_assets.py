@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Build de archivos estáticos para producción
+- Minifica JS y CSS, transcodifica los sonidos WAV a MP3 (si hay ffmpeg)
+- Copia cada archivo a static/dist/ con un hash de contenido en el nombre
+- Genera variantes .br y .gz de los archivos de texto
+- Escribe static/dist/manifest.json y templates/dist/index.html con las rutas nuevas
+
+Ejecuta en el build del deploy: python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import brotli
+import rcssmin
+import rjsmin
+
+from static_assets import DIST_DIR, MANIFEST_PATH
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+OUT_DIR = os.path.join(STATIC_DIR, DIST_DIR)
+TEMPLATE = os.path.join(ROOT, "templates", "index.html")
+TEMPLATE_OUT = os.path.join(ROOT, "templates", "dist", "index.html")
+
+# Orden importante: las imágenes primero para reescribir sus URLs dentro del CSS
+ASSETS = [
+    "pattern-bg.jpg",
+    "sounds/click.wav",
+    "sounds/lose.wav",
+    "sounds/win.wav",
+    "style.css",
+    "app.js",
+    "db-integration.js",
+]
+
+COMPRESSIBLE = (".js", ".css", ".html", ".json", ".svg")
+
+def fingerprint(logical: str, data: bytes, ext: str) -> str:
+    """Ruta relativa a static/ con los primeros 10 hex del sha256 en el nombre"""
+    base = os.path.splitext(logical)[0]
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return f"{DIST_DIR}/{base}.{digest}{ext}"
+
+def transcode_wav(path: str):
+    """WAV -> MP3 mono 96 kbps con ffmpeg; None si ffmpeg no está disponible"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.mp3")
+        subprocess.run(
+            [ffmpeg, "-loglevel", "error", "-y", "-i", path, "-ac", "1", "-b:a", "96k", out],
+            check=True,
+        )
+        with open(out, "rb") as f:
+            return f.read()
+
+def rewrite_urls(text: str, manifest: dict) -> str:
+    """Reemplazar /static/<ruta lógica> por /static/<ruta con hash>"""
+    def repl(match):
+        logical = match.group(1)
+        return "/static/" + manifest.get(logical, logical)
+    return re.sub(r"/static/([\w./-]+)", repl, text)
+
+def write_asset(rel: str, data: bytes) -> int:
+    path = os.path.join(STATIC_DIR, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if rel.endswith(COMPRESSIBLE):
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    return len(data)
+
+def main():
+    print("=" * 60)
+    print("BUILD DE ARCHIVOS ESTÁTICOS")
+    print("=" * 60)
+
+    shutil.rmtree(OUT_DIR, ignore_errors=True)
+    manifest = {}
+
+    for logical in ASSETS:
+        source = os.path.join(STATIC_DIR, logical)
+        with open(source, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(logical)[1]
+
+        if ext == ".js":
+            data = rjsmin.jsmin(data.decode("utf-8")).encode("utf-8")
+        elif ext == ".css":
+            css = rcssmin.cssmin(data.decode("utf-8"))
+            data = rewrite_urls(css, manifest).encode("utf-8")
+        elif ext == ".wav":
+            mp3 = transcode_wav(source)
+            if mp3 is None:
+                print(f"⚠️ ffmpeg no encontrado: {logical} se copia sin transcodificar")
+            else:
+                data, ext = mp3, ".mp3"
+
+        rel = fingerprint(logical, data, ext)
+        size = write_asset(rel, data)
+        manifest[logical] = rel
+        print(f"✅ {logical:22s} -> {rel} ({size:,} bytes)")
+
+    os.makedirs(os.path.dirname(os.path.join(ROOT, MANIFEST_PATH)), exist_ok=True)
+    with open(os.path.join(ROOT, MANIFEST_PATH), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    with open(TEMPLATE, encoding="utf-8") as f:
+        html = rewrite_urls(f.read(), manifest)
+    os.makedirs(os.path.dirname(TEMPLATE_OUT), exist_ok=True)
+    with open(TEMPLATE_OUT, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    print(f"✅ manifest.json y {os.path.relpath(TEMPLATE_OUT, ROOT)} generados")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@
 -- SCRIPT DE CREACIÓN DE TABLAS PARA RULETA WEB
 -- =====================================================
 -- Ejecuta este script en tu base de datos PostgreSQL de Render
+-- Preferible: alembic upgrade head (migrations/, generadas desde models.py)
+-- Si creaste la base con este script: alembic stamp 0003
 -- =====================================================
 
 -- Tabla de Roles
@@ -24,12 +26,46 @@ CREATE TABLE IF NOT EXISTS usuario (
     activo BOOLEAN DEFAULT TRUE
 );
 
--- Tabla de Saldos
+-- Login y auto-login buscan por lower(email): un email (sin importar mayúsculas) es una cuenta
+CREATE UNIQUE INDEX IF NOT EXISTS ix_usuario_email_lower ON usuario (lower(email));
+
+-- Tabla de Saldos (fillfactor 70: cada giro la actualiza y los UPDATE quedan como HOT)
 CREATE TABLE IF NOT EXISTS saldo (
     id_saldo SERIAL PRIMARY KEY,
     id_usuario INTEGER UNIQUE REFERENCES usuario(id_usuario) NOT NULL,
     saldo_actual NUMERIC(10, 2) DEFAULT 500.00 NOT NULL,
-    ultima_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ultima_actualizacion TIMESTAMP DEFAULT timezone('utc', now())
+) WITH (fillfactor = 70);
+
+-- Tabla de Tiradas (historial de giros, se escribe por lotes desde ledger.py)
+CREATE TABLE IF NOT EXISTS tirada (
+    id_tirada BIGSERIAL PRIMARY KEY,
+    id_usuario INTEGER REFERENCES usuario(id_usuario) NOT NULL,
+    apuestas JSONB NOT NULL,
+    numero_ganador SMALLINT NOT NULL,
+    monto_apostado NUMERIC(10, 2) NOT NULL,
+    ganancia NUMERIC(10, 2) NOT NULL,
+    saldo_resultante NUMERIC(10, 2) NOT NULL,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_tirada_id_usuario ON tirada (id_usuario);
+
+-- Estadísticas por jugador (acumuladas incrementalmente desde stats.py)
+CREATE TABLE IF NOT EXISTS estadistica_jugador (
+    id_usuario INTEGER PRIMARY KEY REFERENCES usuario(id_usuario),
+    giros BIGINT DEFAULT 0 NOT NULL,
+    total_apostado NUMERIC(14, 2) DEFAULT 0 NOT NULL,
+    total_ganado NUMERIC(14, 2) DEFAULT 0 NOT NULL,
+    mayor_ganancia NUMERIC(10, 2) DEFAULT 0 NOT NULL
+);
+
+-- Monto apostado por número en apuestas interiores (números favoritos)
+CREATE TABLE IF NOT EXISTS estadistica_numero (
+    id_usuario INTEGER REFERENCES usuario(id_usuario) NOT NULL,
+    numero SMALLINT NOT NULL,
+    monto NUMERIC(14, 2) DEFAULT 0 NOT NULL,
+    PRIMARY KEY (id_usuario, numero)
 );
 
 -- Insertar Roles por Defecto
@@ -86,6 +122,20 @@ SELECT u.email, s.saldo_actual, s.ultima_actualizacion
 FROM saldo s
 JOIN usuario u ON s.id_usuario = u.id_usuario;
 
+-- Últimas tiradas
+SELECT u.email, t.numero_ganador, t.monto_apostado, t.ganancia, t.saldo_resultante, t.fecha
+FROM tirada t
+JOIN usuario u ON t.id_usuario = u.id_usuario
+ORDER BY t.id_tirada DESC
+LIMIT 20;
+
+-- Mayores ganancias por jugador
+SELECT u.email, e.giros, e.total_apostado, e.total_ganado, e.mayor_ganancia
+FROM estadistica_jugador e
+JOIN usuario u ON e.id_usuario = u.id_usuario
+ORDER BY e.mayor_ganancia DESC
+LIMIT 10;
+
 -- =====================================================
 -- FIN DEL SCRIPT
 -- =====================================================
@@ -1,47 +1,221 @@
+import asyncio
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import time
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from metrics import POOL_CHECKOUT
 
-# Leer DATABASE_URL de variables de entorno (Render la proporciona automáticamente)
-DATABASE_URL = os.getenv("DATABASE_URL")
+def _database_url() -> str:
+    # Leer DATABASE_URL de variables de entorno (Render la proporciona automáticamente)
+    url = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL no está configurada en las variables de entorno")
+    if not url:
+        raise ValueError("DATABASE_URL no está configurada en las variables de entorno")
 
-# Fix para Render: cambiar postgres:// a postgresql://
-# SQLAlchemy moderno requiere postgresql:// en lugar de postgres://
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+    # Fix para Render: cambiar postgres:// a postgresql://
+    # SQLAlchemy moderno requiere postgresql:// en lugar de postgres://
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
 
-# Crear engine de SQLAlchemy con pool de conexiones
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=5,              # Número de conexiones permanentes
-    max_overflow=10,          # Conexiones adicionales en picos
-    pool_pre_ping=True        # Verificar conexiones antes de usar
-)
+    # Driver asíncrono: postgresql:// -> postgresql+asyncpg://
+    if url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# ========== CONFIGURACIÓN DEL POOL ==========
+# Presupuesto por worker: pool_size + max_overflow conexiones. Con N workers el total
+# (N * presupuesto) debe quedar por debajo de max_connections de PostgreSQL.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))              # Conexiones permanentes
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))       # Conexiones adicionales en picos
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))     # Segundos esperando conexión libre
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # Reabrir conexiones tras N segundos (-1 = nunca)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = sin límite
+
+# Verificar con un ping solo las conexiones que estuvieron inactivas más de N segundos
+# (0 = en cada checkout, como pool_pre_ping; negativo = nunca)
+PING_IDLE_SECONDS = float(os.getenv("DB_PING_IDLE_SECONDS", "30"))
+
+# Modo PgBouncer (pool_mode=transaction): sin caché de prepared statements y con nombres
+# únicos, porque cada transacción puede caer en otra conexión del servidor
+PGBOUNCER = os.getenv("DB_PGBOUNCER", "").lower() in ("1", "true", "yes")
+
+# Conexiones que se abren al iniciar para que los primeros requests no paguen el connect
+WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", str(POOL_SIZE)))
+
+# /readyz reutiliza el último chequeo de BD durante N segundos
+READY_CHECK_TTL = float(os.getenv("READY_CHECK_TTL", "2"))
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+def _connect_args(url: str) -> dict:
+    if not url.startswith("postgresql+asyncpg://"):
+        return {}
+    args = {}
+    if STATEMENT_TIMEOUT_MS:
+        # Con PgBouncer requiere ignore_startup_parameters = statement_timeout
+        args["server_settings"] = {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}
+    if PGBOUNCER:
+        args["statement_cache_size"] = 0
+        args["prepared_statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return args
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool estándar que mide la espera de cada checkout (incluye abrir conexiones nuevas)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - start)
+
+def _create_engine() -> AsyncEngine:
+    url = _database_url()
+
+    # Crear engine asíncrono de SQLAlchemy con pool de conexiones
+    new_engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=PING_IDLE_SECONDS == 0,
+        connect_args=_connect_args(url),
+    )
+
+    # Ping por inactividad: una conexión usada hace poco no paga el SELECT 1 extra
+    if PING_IDLE_SECONDS > 0:
+        @event.listens_for(new_engine.sync_engine, "checkin")
+        def _mark_checkin(dbapi_connection, connection_record):
+            connection_record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(new_engine.sync_engine, "checkout")
+        def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < PING_IDLE_SECONDS:
+                return
+            try:
+                new_engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                # El pool descarta esta conexión y reintenta el checkout con otra
+                raise exc.DisconnectionError(f"Conexión inactiva no responde: {e}") from e
+
+    return new_engine
+
+# El engine (y el driver asyncpg) se crean en el primer uso, no al importar:
+# importar la app no falla sin DATABASE_URL y el arranque en frío es más corto
+_engine: Optional[AsyncEngine] = None
+
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        _engine = _create_engine()
+    return _engine
+
+def __getattr__(name):
+    # Compatibilidad: "from database import engine" sigue funcionando (crea el engine)
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def pool_status() -> dict:
+    """Estado del pool sin crear el engine ni tocar la BD"""
+    if _engine is None:
+        return {"size": POOL_SIZE, "checked_out": 0, "overflow": 0, "created": False}
+    pool = _engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "created": True,
+    }
+
+def log_pool_config():
+    """Mostrar el presupuesto de conexiones de este worker"""
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    budget = POOL_SIZE + MAX_OVERFLOW
+    ping = "cada checkout" if PING_IDLE_SECONDS == 0 else (
+        "nunca" if PING_IDLE_SECONDS < 0 else f"inactivas > {PING_IDLE_SECONDS:g}s")
+    print(f"🔌 Pool BD: {POOL_SIZE} + {MAX_OVERFLOW} overflow = {budget} conexiones por worker "
+          f"({workers} worker(s) → {budget * workers} máx.), recycle {POOL_RECYCLE}s, "
+          f"ping {ping}, statement_timeout {f'{STATEMENT_TIMEOUT_MS} ms' if STATEMENT_TIMEOUT_MS else 'sin límite'}"
+          + (", modo PgBouncer" if PGBOUNCER else ""))
+
+class _LazySessionmaker(async_sessionmaker):
+    """async_sessionmaker que se enlaza al engine la primera vez que se abre una sesión"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
 
 # Session maker para crear sesiones de BD
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: los objetos siguen legibles tras commit sin otra consulta
+SessionLocal = _LazySessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base para modelos ORM
 Base = declarative_base()
 
 # Dependency para FastAPI - Inyección de dependencias
-def get_db():
-    db = SessionLocal()
-    try:
+def is_row_error(error: Exception) -> bool:
+    """
+    Error causado por los datos de alguna fila (overflow numérico, FK, único...), no por
+    la conexión: reintentar el mismo lote no sirve, pero fila por fila sí
+    """
+    if isinstance(error, (exc.DataError, exc.IntegrityError)):
+        return True
+    # asyncpg llega como DBAPIError genérico: se mira la clase del SQLSTATE (22 datos, 23 integridad)
+    sqlstate = getattr(getattr(error, "orig", None), "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23")
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-# Función para probar conexión al iniciar
-def test_connection():
+async def check_database(timeout: float = READY_CHECK_TIMEOUT) -> Optional[str]:
+    """SELECT 1 con límite de tiempo; devuelve None si responde o el error en texto"""
     try:
-        with engine.connect() as conn:
-            print("✅ Conexión exitosa a PostgreSQL")
-            return True
+        async with asyncio.timeout(timeout):
+            async with get_engine().connect() as conn:
+                await conn.exec_driver_sql("SELECT 1")
+        return None
     except Exception as e:
-        print(f"❌ Error de conexión: {e}")
-        return False
+        return str(e) or type(e).__name__
+
+_last_check = (0.0, "sin verificar")
+
+async def database_ready() -> Optional[str]:
+    """check_database() con caché de READY_CHECK_TTL segundos (para sondas frecuentes)"""
+    global _last_check
+    checked_at, error = _last_check
+    if time.monotonic() - checked_at > READY_CHECK_TTL:
+        error = await check_database()
+        _last_check = (time.monotonic(), error)
+    return error
+
+# Función para probar conexión al iniciar
+async def test_connection():
+    error = await check_database(timeout=POOL_TIMEOUT)
+    global _last_check
+    _last_check = (time.monotonic(), error)
+    if error is None:
+        print("✅ Conexión exitosa a PostgreSQL")
+        return True
+    print(f"❌ Error de conexión: {error}")
+    return False
+
+async def warm_up_pool(connections: int = WARMUP_CONNECTIONS) -> int:
+    """Abrir 'connections' conexiones a la vez y devolverlas al pool listas para usarse"""
+    connections = min(connections, POOL_SIZE)
+    if connections <= 0:
+        return 0
+    engine = get_engine()
+    opened = await asyncio.gather(*(engine.connect().start() for _ in range(connections)),
+                                  return_exceptions=True)
+    await asyncio.gather(*(conn.close() for conn in opened if not isinstance(conn, BaseException)))
+    return sum(not isinstance(conn, BaseException) for conn in opened)
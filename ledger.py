@@ -0,0 +1,171 @@
+# ledger.py - Historial de tiradas con escritura por lotes
+import asyncio
+import json
+import os
+from datetime import datetime
+from sqlalchemy import insert
+from database import SessionLocal, is_row_error
+import metrics
+from models import Tirada
+from stats import player_stats
+
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "500"))
+LEDGER_FLUSH_MS = int(os.getenv("LEDGER_FLUSH_MS", "200"))
+LEDGER_MAX_BUFFER = int(os.getenv("LEDGER_MAX_BUFFER", "100000"))
+# Intentos fallidos del mismo lote antes de escribirlo fila por fila
+LEDGER_MAX_RETRIES = int(os.getenv("LEDGER_MAX_RETRIES", "3"))
+# Tiradas y estadísticas que ni solas se pueden escribir (una por línea, JSON)
+LEDGER_REJECTED_FILE = os.getenv("LEDGER_REJECTED_FILE", "tiradas_rechazadas.jsonl")
+
+LEDGER_DROPPED = metrics.counter("ruleta_ledger_dropped_total", "Tiradas descartadas con el buffer del historial lleno")
+LEDGER_REJECTED = metrics.counter("ruleta_ledger_rejected_total",
+                                  "Tiradas o estadísticas que la BD rechazó aun escritas solas")
+
+class SpinLedger:
+    """
+    Buffer en memoria de tiradas que se vuelca con un INSERT multi-fila
+    cada LEDGER_BATCH_SIZE filas o cada LEDGER_FLUSH_MS milisegundos.
+    El saldo ya quedó confirmado antes de registrar la tirada: el historial
+    nunca bloquea ni altera la liquidación.
+    Cada tirada también actualiza las estadísticas del jugador; sus incrementos
+    se escriben en la misma transacción que el lote del historial.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size=LEDGER_BATCH_SIZE,
+                 flush_ms=LEDGER_FLUSH_MS, max_buffer=LEDGER_MAX_BUFFER, stats=player_stats):
+        self.session_factory = session_factory
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.dropped = 0
+        self.rejected = 0
+        self._overflowing = False
+        self._failures = 0
+
+    def record(self, id_usuario, apuestas, numero_ganador, monto_apostado, ganancia, saldo_resultante):
+        """Encolar una tirada (no hace I/O)"""
+        self.stats.record(id_usuario, apuestas, monto_apostado, ganancia, saldo_resultante)
+        if len(self._buffer) >= self.max_buffer:
+            # El saldo ya se liquidó: la tirada se pierde solo del historial
+            if not self._overflowing:
+                self._overflowing = True
+                print(f"⚠️ Buffer del historial lleno ({self.max_buffer} tiradas): descartando tiradas "
+                      "hasta que la BD vuelva a aceptar escrituras")
+            self.dropped += 1
+            LEDGER_DROPPED.inc()
+            return
+        if self._overflowing:
+            self._overflowing = False
+            print(f"✅ Historial aceptando tiradas de nuevo ({self.dropped} descartadas en total)")
+        self._buffer.append({
+            "id_usuario": id_usuario,
+            "apuestas": apuestas,
+            "numero_ganador": numero_ganador,
+            "monto_apostado": monto_apostado,
+            "ganancia": ganancia,
+            "saldo_resultante": saldo_resultante,
+            "fecha": datetime.utcnow(),
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _write(self, rows, stats):
+        async with self.session_factory() as db:
+            if rows:
+                await db.execute(insert(Tirada), rows)
+            await self.stats.write(db, stats)
+            await db.commit()
+
+    def _restore(self, rows, stats):
+        self._buffer[:0] = rows
+        self.stats.restore_pending(stats)
+
+    def _reject(self, what: str, record, error: Exception):
+        """Descartar algo que la BD no acepta ni solo: se anota en LEDGER_REJECTED_FILE"""
+        self.rejected += 1
+        LEDGER_REJECTED.inc()
+        print(f"❌ {what} rechazada por la BD, se descarta (ver {LEDGER_REJECTED_FILE}): {error}")
+        line = json.dumps({"tipo": what, "datos": record, "error": str(error)}, default=str)
+        with open(LEDGER_REJECTED_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def _write_isolating(self, rows, stats) -> bool:
+        """
+        Escribir cada tirada y las estadísticas de cada jugador en su propia transacción,
+        para que una fila que siempre falla (FK, overflow) no frene al resto.
+        Si el error no es de datos (BD caída) se devuelve lo pendiente y False.
+        """
+        pending, numbers = stats
+        units = [("Tirada", [row], ({}, {}), row) for row in rows]
+        for id_usuario in sorted(set(pending) | {key[0] for key in numbers}):
+            part = ({id_usuario: pending[id_usuario]} if id_usuario in pending else {},
+                    {key: monto for key, monto in numbers.items() if key[0] == id_usuario})
+            record = {"id_usuario": id_usuario, "jugador": part[0].get(id_usuario),
+                      "numeros": {key[1]: monto for key, monto in part[1].items()}}
+            units.append(("Estadística", [], part, record))
+
+        for i, (what, unit_rows, unit_stats, record) in enumerate(units):
+            try:
+                await self._write(unit_rows, unit_stats)
+            except Exception as e:
+                if not is_row_error(e):
+                    print(f"❌ Error guardando historial de tiradas: {e}")
+                    for _, rest_rows, rest_stats, _ in reversed(units[i:]):
+                        self._restore(rest_rows, rest_stats)
+                    return False
+                self._reject(what, record, e)
+        return True
+
+    async def flush(self):
+        """
+        Escribir todo lo pendiente; si falla, las filas vuelven al buffer. Un lote que
+        falla por sus datos (o LEDGER_MAX_RETRIES veces seguidas) se escribe fila por fila.
+        """
+        while True:
+            rows = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            stats = self.stats.take_pending()
+            if not rows and not any(stats):
+                return
+            try:
+                await self._write(rows, stats)
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                if not is_row_error(e) and self._failures < LEDGER_MAX_RETRIES:
+                    print(f"❌ Error guardando historial de tiradas: {e}")
+                    self._restore(rows, stats)
+                    return
+                self._failures = 0
+                if not await self._write_isolating(rows, stats):
+                    return
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detener el volcado periódico y escribir lo que quede"""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+spin_ledger = SpinLedger()
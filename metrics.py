@@ -0,0 +1,160 @@
+# metrics.py - Métricas estilo Prometheus sin dependencias externas
+import bisect
+import time
+
+# Buckets de latencia en segundos (0.5 ms .. 10 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+def _label_text(labels: dict) -> str:
+    if not labels:
+        return ""
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+class Counter:
+    """Contador acumulativo; inc() es una suma de floats, sin asignaciones"""
+    __slots__ = ("name", "help", "labels", "value")
+    kind = "counter"
+
+    def __init__(self, name, help, labels=None):
+        self.name = name
+        self.help = help
+        self.labels = _label_text(labels)
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+class Gauge:
+    """Valor leído con una función al momento del scrape (no cuesta nada por request)"""
+    __slots__ = ("name", "help", "labels", "fn")
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labels=None):
+        self.name = name
+        self.help = help
+        self.labels = _label_text(labels)
+        self.fn = fn
+
+    def samples(self):
+        yield self.name, self.labels, self.fn()
+
+class Histogram:
+    """Histograma de buckets fijos; observe() es un bisect y tres sumas"""
+    __slots__ = ("name", "help", "labels", "buckets", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = _label_text(labels)
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        prefix = self.labels + "," if self.labels else ""
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield self.name + "_bucket", f'{prefix}le="{bound}"', cumulative
+        yield self.name + "_bucket", f'{prefix}le="+Inf"', self.count
+        yield self.name + "_sum", self.labels, self.sum
+        yield self.name + "_count", self.labels, self.count
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+def counter(name, help, labels=None) -> Counter:
+    return register(Counter(name, help, labels))
+
+def gauge(name, help, fn, labels=None) -> Gauge:
+    return register(Gauge(name, help, fn, labels))
+
+def histogram(name, help, labels=None, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return register(Histogram(name, help, labels, buckets))
+
+def render() -> str:
+    """Formato de texto de Prometheus (0.0.4)"""
+    # Las series de una misma familia deben ir juntas aunque se registren en distinto momento
+    families = {}
+    for metric in _registry:
+        families.setdefault(metric.name, []).append(metric)
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family[0].help}")
+        lines.append(f"# TYPE {name} {family[0].kind}")
+        for metric in family:
+            for sample, labels, value in metric.samples():
+                lines.append(f"{sample}{{{labels}}} {value}" if labels else f"{sample} {value}")
+    lines.append("")
+    return "\n".join(lines)
+
+# ========== MÉTRICAS DE LA APLICACIÓN ==========
+
+SPINS = counter("ruleta_spins_total", "Giros liquidados")
+WINS = counter("ruleta_wins_total", "Giros con alguna apuesta ganadora")
+STAKE = counter("ruleta_stake_total", "Total apostado")
+PAYOUT = counter("ruleta_payout_total", "Total pagado (ganancia más apuesta devuelta)")
+
+DECODE_TOKEN = histogram("ruleta_decode_token_seconds", "Tiempo en auth.decode_token")
+VERIFY_PASSWORD = histogram("ruleta_verify_password_seconds", "Tiempo de verificación Argon2 (incluye cola del pool)")
+POOL_CHECKOUT = histogram("ruleta_db_pool_checkout_seconds", "Espera para obtener una conexión del pool")
+SALDO_QUERY = histogram("ruleta_db_saldo_query_seconds", "Tiempo de las consultas/UPDATE de saldo")
+DB_COMMIT = histogram("ruleta_db_commit_seconds", "Tiempo de commit")
+
+def record_spin(stake, win_value):
+    """Contabilizar un giro liquidado"""
+    SPINS.inc()
+    STAKE.inc(stake)
+    if win_value > 0:
+        WINS.inc()
+        PAYOUT.inc(win_value + stake)
+
+_route_latency = {}
+
+def route_latency(path: str) -> Histogram:
+    """Histograma por ruta; se crea una vez por plantilla de ruta, no por request"""
+    hist = _route_latency.get(path)
+    if hist is None:
+        hist = _route_latency[path] = histogram(
+            "ruleta_http_request_duration_seconds", "Latencia de requests HTTP por ruta", {"route": path}
+        )
+    return hist
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia de cada request HTTP por plantilla de ruta"""
+
+    def __init__(self, app, on_first_request=None):
+        self.app = app
+        self.on_first_request = on_first_request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.on_first_request is not None:
+            callback, self.on_first_request = self.on_first_request, None
+            callback()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                path = route.path
+            elif scope["path"].startswith("/static/"):
+                path = "/static"
+            else:
+                path = "other"
+            route_latency(path).observe(time.perf_counter() - start)
@@ -0,0 +1,45 @@
+# migrations/env.py - Alembic con el mismo DATABASE_URL y driver asíncrono que la app
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import models  # registra las tablas en Base.metadata
+from database import Base, _database_url
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# --autogenerate compara contra models.py. No detecta cambios de parámetros de
+# almacenamiento (fillfactor) ni de defaults: esos se escriben a mano en la migración
+target_metadata = Base.metadata
+
+def _configure(**kwargs):
+    context.configure(target_metadata=target_metadata, **kwargs)
+
+def run_migrations_offline():
+    """alembic upgrade --sql: solo genera el SQL"""
+    _configure(url=_database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def do_run_migrations(connection):
+    _configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_migrations_online():
+    # NullPool: sin el pool ni los eventos de ping de la app, una conexión y listo
+    engine = create_async_engine(_database_url(), poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,74 @@
+"""historial de tiradas y estadísticas por jugador
+
+Tablas que el servidor agregó sobre el esquema inicial: tirada (ledger.py) y
+estadistica_jugador / estadistica_numero (stats.py). Una base creada con una versión
+intermedia de create_tables.sql ya puede tenerlas: solo se crean las que falten.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:01:22.541207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing(table: str) -> bool:
+    # Con --sql no hay conexión que inspeccionar: se generan todas
+    if op.get_context().as_sql:
+        return True
+    return not sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _missing('tirada'):
+        op.create_table('tirada',
+        sa.Column('id_tirada', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('id_usuario', sa.Integer(), nullable=False),
+        sa.Column('apuestas', sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), 'postgresql'), nullable=False),
+        sa.Column('numero_ganador', sa.SmallInteger(), nullable=False),
+        sa.Column('monto_apostado', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('ganancia', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('saldo_resultante', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('fecha', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.ForeignKeyConstraint(['id_usuario'], ['usuario.id_usuario'], ),
+        sa.PrimaryKeyConstraint('id_tirada')
+        )
+        op.create_index(op.f('ix_tirada_id_usuario'), 'tirada', ['id_usuario'], unique=False)
+    if _missing('estadistica_jugador'):
+        op.create_table('estadistica_jugador',
+        sa.Column('id_usuario', sa.Integer(), nullable=False),
+        sa.Column('giros', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('total_apostado', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+        sa.Column('total_ganado', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+        sa.Column('mayor_ganancia', sa.Numeric(precision=10, scale=2), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['id_usuario'], ['usuario.id_usuario'], ),
+        sa.PrimaryKeyConstraint('id_usuario')
+        )
+    if _missing('estadistica_numero'):
+        op.create_table('estadistica_numero',
+        sa.Column('id_usuario', sa.Integer(), nullable=False),
+        sa.Column('numero', sa.SmallInteger(), nullable=False),
+        sa.Column('monto', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['id_usuario'], ['usuario.id_usuario'], ),
+        sa.PrimaryKeyConstraint('id_usuario', 'numero')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('estadistica_numero')
+    op.drop_table('estadistica_jugador')
+    op.drop_index(op.f('ix_tirada_id_usuario'), table_name='tirada')
+    op.drop_table('tirada')
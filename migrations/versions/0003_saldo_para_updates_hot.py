@@ -0,0 +1,70 @@
+"""saldo para updates HOT e índice único lower(email)
+
+Cada giro reescribe una fila de saldo. Con fillfactor 70 el UPDATE encuentra lugar en la
+misma página y queda como HOT (sin nuevas entradas de índice: saldo_actual y
+ultima_actualizacion no están indexadas), así la tabla y sus índices no se inflan.
+ultima_actualizacion pasa a calcularse en el servidor (models.utcnow).
+
+Login y auto-login buscan por lower(email): el índice es único para que un email
+identifique a una sola cuenta sin importar mayúsculas. Si ya hay cuentas que solo
+difieren en mayúsculas la migración se detiene y las lista; hay que unificarlas antes.
+
+El fillfactor solo aplica a páginas nuevas; para reescribir las existentes (bloquea la
+tabla unos segundos): VACUUM FULL saldo;
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:01:31.327514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _check_email_duplicates()
+
+    op.execute("ALTER TABLE saldo SET (fillfactor = 70)")
+    op.alter_column('saldo', 'ultima_actualizacion', server_default=sa.text("timezone('utc', now())"))
+
+    # CONCURRENTLY no bloquea los logins mientras se construye (fuera de la transacción).
+    # Si falla a medias deja un índice INVALID: DROP INDEX ix_usuario_email_lower y reintentar
+    with op.get_context().autocommit_block():
+        op.create_index('ix_usuario_email_lower', 'usuario', [sa.literal_column('lower(email)')],
+                        unique=True, postgresql_concurrently=True)
+
+
+def _check_email_duplicates():
+    """Cuentas cuyo email solo difiere en mayúsculas (el índice único no se podría crear)"""
+    if op.get_context().as_sql:
+        return
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT lower(email), string_agg(email, ', ' ORDER BY id_usuario)
+        FROM usuario GROUP BY lower(email) HAVING count(*) > 1
+        ORDER BY 1 LIMIT 20
+    """)).all()
+    if duplicates:
+        listed = "\n".join(f"  {emails}" for _, emails in duplicates)
+        raise RuntimeError(
+            "Hay emails repetidos sin distinguir mayúsculas; unifica esas cuentas "
+            f"antes de migrar:\n{listed}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_usuario_email_lower', table_name='usuario', postgresql_concurrently=True)
+
+    op.alter_column('saldo', 'ultima_actualizacion', server_default=sa.text('CURRENT_TIMESTAMP'))
+    op.execute("ALTER TABLE saldo RESET (fillfactor)")
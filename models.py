@@ -1,8 +1,24 @@
-from sqlalchemy import Column, Integer, String, Boolean, Numeric, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Boolean, Numeric, DateTime, ForeignKey, Text, JSON, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 from datetime import datetime
 from database import Base
 
+class utcnow(FunctionElement):
+    """Hora UTC calculada por el servidor de BD (mismo valor que datetime.utcnow, sin parámetro por fila)"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
 class Rol(Base):
     __tablename__ = 'rol'
     
@@ -26,13 +42,50 @@ class Usuario(Base):
     # Relación 1:1 con Saldo
     saldo = relationship("Saldo", uselist=False, back_populates="usuario")
 
+    # Login y auto-login buscan por lower(email): único para que identifique a una sola cuenta
+    __table_args__ = (
+        Index("ix_usuario_email_lower", func.lower(email), unique=True),
+    )
+
 class Saldo(Base):
     __tablename__ = 'saldo'
     
     id_saldo = Column(Integer, primary_key=True)
     id_usuario = Column(Integer, ForeignKey('usuario.id_usuario'), unique=True, nullable=False)
     saldo_actual = Column(Numeric(10, 2), nullable=False, default=0)
-    ultima_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    ultima_actualizacion = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    # Cada giro reescribe una fila: 30% de cada página libre para que el UPDATE quede en
+    # la misma página (HOT, sin tocar índices). Ninguna columna que cambia está indexada.
+    __table_args__ = {"postgresql_with": {"fillfactor": 70}}
     
     # Relación inversa
     usuario = relationship("Usuario", back_populates="saldo")
+
+class Tirada(Base):
+    __tablename__ = 'tirada'
+    
+    id_tirada = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    id_usuario = Column(Integer, ForeignKey('usuario.id_usuario'), nullable=False, index=True)
+    apuestas = Column(JSON().with_variant(JSONB, 'postgresql'), nullable=False)
+    numero_ganador = Column(SmallInteger, nullable=False)
+    monto_apostado = Column(Numeric(10, 2), nullable=False)
+    ganancia = Column(Numeric(10, 2), nullable=False)
+    saldo_resultante = Column(Numeric(10, 2), nullable=False)
+    fecha = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class EstadisticaJugador(Base):
+    __tablename__ = 'estadistica_jugador'
+    
+    id_usuario = Column(Integer, ForeignKey('usuario.id_usuario'), primary_key=True)
+    giros = Column(BigInteger, nullable=False, default=0)
+    total_apostado = Column(Numeric(14, 2), nullable=False, default=0)
+    total_ganado = Column(Numeric(14, 2), nullable=False, default=0)
+    mayor_ganancia = Column(Numeric(10, 2), nullable=False, default=0)
+
+class EstadisticaNumero(Base):
+    __tablename__ = 'estadistica_numero'
+    
+    id_usuario = Column(Integer, ForeignKey('usuario.id_usuario'), primary_key=True)
+    numero = Column(SmallInteger, primary_key=True)
+    monto = Column(Numeric(14, 2), nullable=False, default=0)
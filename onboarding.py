@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Alta masiva de jugadores y abonos de saldo desde CSV (PostgreSQL, COPY por bloques)
+
+Jugadores: encabezado nombre,apellido,curp,email,password[,saldo]
+Abonos:    encabezado email,monto (monto negativo = cargo; no deja saldos negativos)
+
+El CSV se lee como stream y se procesa en bloques de BULK_CHUNK_SIZE filas: la memoria
+no depende del tamaño del archivo. Los passwords se hashean con Argon2 en varios
+procesos mientras el bloque anterior se copia a la BD.
+
+Ejecuta: python onboarding.py usuarios jugadores.csv
+         python onboarding.py abonos bonos.csv
+También disponible en /api/admin/usuarios y /api/admin/abonos (rol admin).
+Desde los endpoints el leaderboard de saldos se actualiza al momento; desde la CLI el
+servidor los ve al reiniciar o en la siguiente recarga (STATS_REFRESH_SECONDS).
+"""
+
+import argparse
+import asyncio
+import codecs
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+from balances import hot_balances
+from database import SessionLocal, get_engine
+from stats import player_stats
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Cada proceso usa ARGON2_MEMORY_COST KiB por hash
+BULK_HASH_PROCESSES = int(os.getenv("BULK_HASH_PROCESSES", str(os.cpu_count() or 1)))
+SALDO_INICIAL = Decimal(os.getenv("SALDO_INICIAL", "500"))
+ROL_JUGADOR = "jugador"
+
+# Límites de las columnas (models.py)
+MAX_MONTO = Decimal("99999999.99")
+MAX_ERRORS = 20
+
+USER_COLUMNS = ("nombre", "apellido", "curp", "email", "password_hash", "saldo")
+
+_CREATE_TMP_USUARIO = """
+CREATE TEMP TABLE tmp_usuario (
+    nombre VARCHAR(50), apellido VARCHAR(50), curp VARCHAR(50),
+    email VARCHAR(100), password_hash VARCHAR(255), saldo NUMERIC(10, 2)
+) ON COMMIT DROP
+"""
+
+# Los emails que ya existen (o repetidos en el bloque), sin distinguir mayúsculas como el
+# login, se omiten; el saldo solo se crea para los insertados. ON CONFLICT sin columnas
+# cubre tanto UNIQUE(email) como ix_usuario_email_lower
+_INSERT_USUARIOS = """
+WITH unicos AS (
+    SELECT DISTINCT ON (lower(email)) * FROM tmp_usuario
+), nuevos AS (
+    INSERT INTO usuario (id_rol, nombre, apellido, curp, email, password_hash, fecha_registro, activo)
+    SELECT $1, nombre, apellido, curp, email, password_hash, now() AT TIME ZONE 'utc', true
+    FROM unicos
+    ON CONFLICT DO NOTHING
+    RETURNING id_usuario, email
+)
+INSERT INTO saldo (id_usuario, saldo_actual, ultima_actualizacion)
+SELECT n.id_usuario, u.saldo, now() AT TIME ZONE 'utc'
+FROM nuevos n JOIN unicos u ON u.email = n.email
+RETURNING id_usuario, saldo_actual
+"""
+
+_CREATE_TMP_ABONO = """
+CREATE TEMP TABLE tmp_abono (email VARCHAR(100), monto NUMERIC(10, 2)) ON COMMIT DROP
+"""
+
+_ABONOS_POR_USUARIO = """
+SELECT u.id_usuario, sum(t.monto) AS monto
+FROM tmp_abono t JOIN usuario u ON lower(u.email) = lower(t.email)
+GROUP BY u.id_usuario
+"""
+
+# Un solo UPDATE para todo el archivo; los cargos que dejarían saldo negativo no se aplican
+_APPLY_ABONOS = f"""
+WITH a AS ({_ABONOS_POR_USUARIO})
+UPDATE saldo s
+SET saldo_actual = s.saldo_actual + a.monto, ultima_actualizacion = now() AT TIME ZONE 'utc'
+FROM a
+WHERE s.id_usuario = a.id_usuario AND s.saldo_actual + a.monto >= 0
+RETURNING s.id_usuario, s.saldo_actual
+"""
+
+_CONTAR_ABONOS = """
+SELECT count(DISTINCT u.id_usuario), count(*) FILTER (WHERE u.id_usuario IS NULL)
+FROM tmp_abono t LEFT JOIN usuario u ON lower(u.email) = lower(t.email)
+"""
+
+class BulkError(ValueError):
+    """CSV o base de datos no válidos para la carga masiva"""
+
+class NewUser(NamedTuple):
+    nombre: str
+    apellido: str
+    curp: str
+    email: str
+    password: str
+    saldo: Decimal
+
+# ========== LECTURA DEL CSV ==========
+
+async def _csv_rows(chunks, required: set):
+    """
+    (número de línea, fila como dict) leyendo el stream por bloques de bytes.
+    Los campos no pueden contener saltos de línea.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    line_no = 0
+    buffer = ""
+
+    def parse(lines):
+        nonlocal header, line_no
+        for line in lines:
+            line_no += 1
+            line = line.rstrip("\r")
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                missing = required - set(header)
+                if missing:
+                    raise BulkError(f"Faltan columnas en el encabezado: {', '.join(sorted(missing))}")
+                continue
+            yield line_no, dict(zip(header, (value.strip() for value in values)))
+
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for row in parse(lines):
+            yield row
+    buffer += decoder.decode(b"", final=True)
+    for row in parse([buffer]):
+        yield row
+    if header is None:
+        raise BulkError("El CSV está vacío")
+
+async def _batches(rows, size: int):
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _monto(value: str, allow_negative: bool) -> Decimal:
+    monto = Decimal(value).quantize(Decimal("0.01"))
+    if abs(monto) > MAX_MONTO or (monto < 0 and not allow_negative):
+        raise InvalidOperation
+    return monto
+
+def _new_user(row: dict) -> NewUser:
+    """Validar una fila de jugador (ValueError con el motivo)"""
+    for field, limit in (("nombre", 50), ("apellido", 50), ("curp", 50), ("email", 100)):
+        if not row.get(field):
+            raise ValueError(f"{field} vacío")
+        if len(row[field]) > limit:
+            raise ValueError(f"{field} excede {limit} caracteres")
+    if "@" not in row["email"]:
+        raise ValueError("email inválido")
+    if not row.get("password"):
+        raise ValueError("password vacío")
+    try:
+        saldo = _monto(row["saldo"], allow_negative=False) if row.get("saldo") else SALDO_INICIAL
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"saldo inválido: {row.get('saldo')!r}")
+    return NewUser(row["nombre"], row["apellido"], row["curp"], row["email"], row["password"], saldo)
+
+class _Report:
+    """Conteos, primeros errores y avance impreso por bloque"""
+
+    def __init__(self, title: str):
+        self.title = title
+        self.started = time.perf_counter()
+        self.counts = {"leidas": 0, "invalidas": 0}
+        self.errors = []
+
+    def invalid(self, line_no: int, reason: str):
+        self.counts["invalidas"] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"línea {line_no}: {reason}")
+
+    def progress(self, detail: str):
+        elapsed = time.perf_counter() - self.started
+        rate = self.counts["leidas"] / elapsed if elapsed else 0
+        print(f"📥 {self.title}: {self.counts['leidas']} filas leídas, {detail} ({rate:,.0f} filas/s)")
+
+    def summary(self) -> dict:
+        return {**self.counts, "errores": self.errors,
+                "segundos": round(time.perf_counter() - self.started, 2)}
+
+async def _raw_connection(conn):
+    """Conexión asyncpg debajo de la conexión de SQLAlchemy (para COPY)"""
+    if conn.dialect.name != "postgresql":
+        raise BulkError("La carga masiva requiere PostgreSQL (COPY)")
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+# ========== ALTA DE JUGADORES ==========
+
+def _hash_passwords(passwords: list) -> list:
+    # Corre en un proceso del pool: importa auth ahí para usar los mismos parámetros de Argon2
+    from auth import pwd_context
+    return [pwd_context.hash(password) for password in passwords]
+
+async def _hash_all(pool, passwords: list) -> list:
+    """Repartir un bloque de passwords entre los procesos del pool"""
+    loop = asyncio.get_running_loop()
+    step = -(-len(passwords) // BULK_HASH_PROCESSES)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_passwords, passwords[i:i + step])
+        for i in range(0, len(passwords), step)
+    ))
+    return [password_hash for part in parts for password_hash in part]
+
+async def import_users(chunks) -> dict:
+    """
+    Crear jugadores desde un CSV (stream de bytes). Cada bloque se copia con COPY a una
+    tabla temporal y se inserta en usuario y saldo en su propia transacción; los emails
+    ya registrados se omiten, así que repetir un archivo interrumpido es seguro.
+    """
+    report = _Report("Alta de jugadores")
+    report.counts.update(creadas=0, omitidas=0)
+    required = {"nombre", "apellido", "curp", "email", "password"}
+
+    async def valid_users():
+        async for line_no, row in _csv_rows(chunks, required):
+            report.counts["leidas"] += 1
+            try:
+                user = _new_user(row)
+            except ValueError as e:
+                report.invalid(line_no, str(e))
+                continue
+            yield user
+
+    async with get_engine().connect() as conn:
+        pg = await _raw_connection(conn)
+        id_rol = await pg.fetchval("SELECT id_rol FROM rol WHERE nombre = $1", ROL_JUGADOR)
+        if id_rol is None:
+            raise BulkError(f"No existe el rol '{ROL_JUGADOR}'")
+
+        async def store(batch, hashing):
+            hashes = await hashing
+            records = [(u.nombre, u.apellido, u.curp, u.email, h, u.saldo) for u, h in zip(batch, hashes)]
+            async with pg.transaction():
+                await pg.execute(_CREATE_TMP_USUARIO)
+                await pg.copy_records_to_table("tmp_usuario", records=records, columns=USER_COLUMNS)
+                created = await pg.fetch(_INSERT_USUARIOS, id_rol)
+            player_stats.set_balances(dict(created))
+            report.counts["creadas"] += len(created)
+            report.counts["omitidas"] += len(batch) - len(created)
+            report.progress(f"{report.counts['creadas']} creadas")
+
+        pool = ProcessPoolExecutor(max_workers=BULK_HASH_PROCESSES,
+                                   mp_context=multiprocessing.get_context("spawn"))
+        previous = None
+        try:
+            async for batch in _batches(valid_users(), BULK_CHUNK_SIZE):
+                # Hashear este bloque mientras se copia el anterior
+                hashing = asyncio.ensure_future(_hash_all(pool, [u.password for u in batch]))
+                if previous is not None:
+                    await store(*previous)
+                previous = (batch, hashing)
+            if previous is not None:
+                await store(*previous)
+                previous = None
+        finally:
+            if previous is not None:
+                previous[1].cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return report.summary()
+
+# ========== ABONOS DE SALDO ==========
+
+async def _credits_by_user(pg) -> dict:
+    """{id_usuario: monto} del archivo completo, leído por bloques con un cursor"""
+    credits = {}
+    cursor = await pg.cursor(_ABONOS_POR_USUARIO)
+    while True:
+        rows = await cursor.fetch(BULK_CHUNK_SIZE)
+        if not rows:
+            return credits
+        credits.update(rows)
+
+async def _credit_hot_balances(credits: dict) -> dict:
+    """
+    Con BALANCE_STORE=memory la capa en memoria es dueña de saldo_actual: los abonos se
+    aplican ahí (y llegan a la tabla por write-behind) en lugar del UPDATE directo.
+    Una sola llamada a credit_many: si algo falla antes, no queda ningún abono aplicado.
+    """
+    async with SessionLocal() as db:
+        balances = await hot_balances.credit_many(db, credits)
+    return {id_usuario: balance for id_usuario, balance in balances.items() if balance is not None}
+
+async def apply_credits(chunks) -> dict:
+    """
+    Abonar (o cargar) montos por email desde un CSV. Todas las filas se copian con COPY
+    a una tabla temporal y se aplican con un solo UPDATE por conjuntos (varias filas del
+    mismo email se suman). Todo ocurre en una transacción: o se aplica el archivo o nada.
+    Con BALANCE_STORE=memory los abonos se leen en esa transacción y se aplican juntos
+    en memoria al terminarla.
+    """
+    report = _Report("Abonos de saldo")
+    report.counts.update(abonados=0, rechazados=0, sin_usuario=0)
+
+    async def valid_credits():
+        async for line_no, row in _csv_rows(chunks, {"email", "monto"}):
+            report.counts["leidas"] += 1
+            if not row.get("email"):
+                report.invalid(line_no, "email vacío")
+                continue
+            try:
+                monto = _monto(row.get("monto", ""), allow_negative=True)
+            except (InvalidOperation, ValueError):
+                report.invalid(line_no, f"monto inválido: {row.get('monto')!r}")
+                continue
+            yield row["email"], monto
+
+    async with get_engine().connect() as conn:
+        pg = await _raw_connection(conn)
+        async with pg.transaction():
+            await pg.execute(_CREATE_TMP_ABONO)
+            async for batch in _batches(valid_credits(), BULK_CHUNK_SIZE):
+                await pg.copy_records_to_table("tmp_abono", records=batch, columns=("email", "monto"))
+                report.progress("copiando")
+            await pg.execute("ANALYZE tmp_abono")
+
+            matched, report.counts["sin_usuario"] = await pg.fetchrow(_CONTAR_ABONOS)
+            if hot_balances.enabled:
+                credits = await _credits_by_user(pg)
+            else:
+                applied = dict(await pg.fetch(_APPLY_ABONOS))
+    if hot_balances.enabled:
+        applied = await _credit_hot_balances(credits)
+    # Leaderboard de saldos de este proceso (los giros lo actualizan solos; los abonos no)
+    player_stats.set_balances(applied)
+    report.counts["abonados"] = len(applied)
+    report.counts["rechazados"] = matched - len(applied)
+    report.progress(f"{len(applied)} saldos actualizados")
+    return report.summary()
+
+# ========== CLI ==========
+
+async def _file_chunks(path: str, size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, size)
+            if not chunk:
+                return
+            yield chunk
+
+async def _main(command: str, path: str) -> dict:
+    try:
+        if command == "usuarios":
+            return await import_users(_file_chunks(path))
+        if hot_balances.enabled:
+            # Otro proceso (el servidor) es dueño de los saldos: usar /api/admin/abonos
+            raise BulkError("Con BALANCE_STORE=memory los abonos se aplican desde /api/admin/abonos")
+        return await apply_credits(_file_chunks(path))
+    finally:
+        await get_engine().dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alta masiva de jugadores y abonos de saldo desde CSV")
+    parser.add_argument("comando", choices=("usuarios", "abonos"))
+    parser.add_argument("csv", help="Ruta del archivo CSV (UTF-8)")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = asyncio.run(_main(args.comando, args.csv))
+    except BulkError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    for key, value in summary.items():
+        if key != "errores":
+            print(f"{key:12s} {value}")
+    for error in summary["errores"]:
+        print(f"⚠️ {error}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
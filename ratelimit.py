@@ -0,0 +1,142 @@
+# ratelimit.py - Límite de intentos de login con token buckets (memoria acotada o Redis compartido)
+import math
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import HTTPException, Request, status
+
+import metrics
+
+# "N/S": N intentos de ráfaga, recargados a N por cada S segundos
+LOGIN_RATE_IP = os.getenv("LOGIN_RATE_IP", "20/60")
+LOGIN_RATE_EMAIL = os.getenv("LOGIN_RATE_EMAIL", "5/60")
+AUTOLOGIN_RATE_IP = os.getenv("AUTOLOGIN_RATE_IP", "30/60")
+AUTOLOGIN_RATE_EMAIL = os.getenv("AUTOLOGIN_RATE_EMAIL", "10/60")
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# Proxies confiables delante de la app (Render, nginx). Cada uno agrega al final de
+# X-Forwarded-For la IP que lo contactó: la IP real es la entrada número N desde la
+# derecha; las de la izquierda las escribe el cliente y no cuentan.
+# En Render (variable RENDER presente) hay un proxy; sin proxy debe ser 0, o cualquiera
+# podría elegir su IP. Con 0 se usa la IP de la conexión.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS") or (1 if os.getenv("RENDER") else 0))
+# redis://host:6379/0 para compartir los límites entre workers (requiere pip install redis)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+RATE_LIMITED = metrics.counter("ruleta_rate_limited_total", "Requests rechazados por límite de intentos")
+
+class Rate(NamedTuple):
+    capacity: float   # tokens de ráfaga
+    per_second: float # recarga
+
+    @classmethod
+    def parse(cls, spec: str) -> "Rate":
+        count, _, seconds = spec.partition("/")
+        count = float(count)
+        return cls(count, count / float(seconds or 1))
+
+class MemoryBuckets:
+    """
+    Token buckets en memoria de tamaño fijo: RATE_LIMIT_SHARDS diccionarios LRU con
+    RATE_LIMIT_MAX_KEYS / shards claves cada uno. Al llenarse un shard se descarta la
+    clave usada hace más tiempo (un atacante que rota IPs solo expulsa buckets viejos).
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS, shards=RATE_LIMIT_SHARDS):
+        self.shards = [OrderedDict() for _ in range(shards)]
+        self.shard_size = max(1, max_keys // shards)
+
+    async def hit(self, key: str, rate: Rate) -> float:
+        """Consumir un token; devuelve 0 si se permite o los segundos hasta el próximo token"""
+        shard = self.shards[zlib.crc32(key.encode()) % len(self.shards)]
+        now = time.monotonic()
+        bucket = shard.get(key)
+        if bucket is None:
+            bucket = shard[key] = [rate.capacity, now]
+            if len(shard) > self.shard_size:
+                shard.popitem(last=False)
+        else:
+            shard.move_to_end(key)
+            bucket[0] = min(rate.capacity, bucket[0] + (now - bucket[1]) * rate.per_second)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate.per_second
+
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry)
+"""
+
+class RedisBuckets:
+    """Los mismos buckets en Redis (script Lua atómico): el límite aplica a todos los workers"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL requiere el paquete redis (pip install redis)") from e
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def hit(self, key: str, rate: Rate) -> float:
+        try:
+            retry = await self.script(keys=["ruleta:rl:" + key], args=[rate.capacity, rate.per_second, time.time()])
+        except Exception as e:
+            # Sin Redis no se bloquea el login: se registra y se deja pasar
+            print(f"❌ Error en rate limit compartido: {e}")
+            return 0.0
+        return float(retry)
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def check(self, *limits):
+        """
+        limits: (clave, Rate). Lanza 429 con Retry-After al primer bucket vacío.
+        Se llama antes de consultar la BD o verificar el password.
+        """
+        for key, rate in limits:
+            retry_after = await self.backend.hit(key, rate)
+            if retry_after > 0:
+                RATE_LIMITED.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Demasiados intentos, espera un momento",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+
+def client_ip(request: Request) -> str:
+    """IP del cliente para los límites: la que agregó el último proxy confiable"""
+    if RATE_LIMIT_PROXY_HOPS:
+        hops = [ip.strip() for header in request.headers.getlist("x-forwarded-for") for ip in header.split(",")]
+        if len(hops) >= RATE_LIMIT_PROXY_HOPS:
+            return hops[-RATE_LIMIT_PROXY_HOPS]
+    return request.client.host if request.client else "desconocida"
+
+login_rate_ip = Rate.parse(LOGIN_RATE_IP)
+login_rate_email = Rate.parse(LOGIN_RATE_EMAIL)
+autologin_rate_ip = Rate.parse(AUTOLOGIN_RATE_IP)
+autologin_rate_email = Rate.parse(AUTOLOGIN_RATE_EMAIL)
+
+rate_limiter = RateLimiter(RedisBuckets(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBuckets())
@@ -0,0 +1,69 @@
+# rng.py - Generador de números ganadores (CSPRNG con buffer)
+import os
+import random
+import threading
+from typing import Optional
+
+from roulette import NUM_POCKETS
+
+# Rechazo: solo se aceptan bytes < 222 (6 * 37) para que byte % 37 sea uniforme
+_ACCEPT_LIMIT = (256 // NUM_POCKETS) * NUM_POCKETS
+_MOD_TABLE = bytes(b % NUM_POCKETS if b < _ACCEPT_LIMIT else 0 for b in range(256))
+_REJECTED = bytes(range(_ACCEPT_LIMIT, 256))
+
+class WheelRNG:
+    """
+    Fuente de números 0-36 para la rueda.
+    Modo normal: bytes de os.urandom en bloques grandes, un buffer por hilo (sin lock global).
+    Modo con semilla: secuencia determinista para tests y repeticiones; un solo flujo
+    compartido, pensado para el event loop (un hilo).
+    """
+
+    def __init__(self, seed: Optional[int] = None, block_size: int = 4096):
+        self.block_size = block_size
+        self.seed = seed
+        self._seeded = random.Random(seed) if seed is not None else None
+        self._local = threading.local()
+
+    def _random_bytes(self) -> bytes:
+        if self._seeded is not None:
+            return self._seeded.randbytes(self.block_size)
+        return os.urandom(self.block_size)
+
+    def _refill(self):
+        # translate en C: mapea cada byte a byte % 37 y elimina los rechazados
+        draws = iter(self._random_bytes().translate(_MOD_TABLE, _REJECTED))
+        self._local.draws = draws
+        return draws
+
+    def spin(self) -> int:
+        """Número ganador uniforme en 0..36"""
+        draws = getattr(self._local, "draws", None) or self._refill()
+        n = next(draws, None)
+        while n is None:
+            n = next(self._refill(), None)
+        return n
+
+    def spins(self, count: int) -> list:
+        """Varios números ganadores seguidos (autoplay, simulaciones)"""
+        spin = self.spin
+        return [spin() for _ in range(count)]
+
+def _seed_from_env() -> Optional[int]:
+    """
+    RULETA_SEED hace predecibles todos los números ganadores: solo se acepta junto con
+    RULETA_SEED_REPLAY=1 (tests y repeticiones), nunca por descuido en producción.
+    Los tests pueden usar WheelRNG(seed=...) directamente sin tocar el entorno.
+    """
+    seed = os.getenv("RULETA_SEED")
+    if not seed:
+        return None
+    if os.getenv("RULETA_SEED_REPLAY", "").lower() not in ("1", "true", "yes"):
+        raise RuntimeError(
+            "RULETA_SEED hace predecibles los giros: defínelo solo junto con RULETA_SEED_REPLAY=1 "
+            "(tests o repeticiones), nunca en producción"
+        )
+    print(f"⚠️ RULETA_SEED={seed}: números ganadores DETERMINISTAS (modo repetición, no usar con dinero real)")
+    return int(seed)
+
+wheel_rng = WheelRNG(_seed_from_env())
@@ -0,0 +1,167 @@
+# roulette.py - Mesa de ruleta europea y motor de evaluación de apuestas
+from typing import Iterable, NamedTuple, Optional
+
+# -----------------------------------------------------------
+#  RULETA EUROPEA — ORDEN REAL OFICIAL (sentido horario)
+# -----------------------------------------------------------
+WHEEL_ORDER = [
+    0, 32, 15, 19, 4, 21, 2, 25, 17, 34, 6,
+    27, 13, 36, 11, 30, 8, 23, 10, 5, 24,
+    16, 33, 1, 20, 14, 31, 9, 22, 18, 29,
+    7, 28, 12, 35, 3, 26
+]
+
+RED_NUMBERS = {
+    1, 3, 5, 7, 9, 12, 14, 16,
+    18, 19, 21, 23, 25, 27,
+    30, 32, 34, 36
+}
+
+NUM_POCKETS = 37
+
+def color_of(n):
+    """Determinar color del número"""
+    if n == 0:
+        return "verde"
+    return "rojo" if n in RED_NUMBERS else "negro"
+
+# ========== TABLA DE APUESTAS LEGALES ==========
+
+class LayoutBet(NamedTuple):
+    """Apuesta legal del tapete: números cubiertos y pago"""
+    kind: str
+    numbers: tuple
+    odds: int
+
+class InvalidBet(ValueError):
+    """La apuesta no corresponde a ninguna casilla real del tapete"""
+
+def _layout_groups():
+    """Generar (tipo, números) para cada apuesta legal de la mesa europea"""
+    # Pleno
+    for n in range(NUM_POCKETS):
+        yield "straight", (n,)
+
+    # Caballos horizontales, verticales y con el cero
+    for row in range(12):
+        base = 3 * row + 1
+        yield "split", (base, base + 1)
+        yield "split", (base + 1, base + 2)
+    for n in range(1, 34):
+        yield "split", (n, n + 3)
+    for n in (1, 2, 3):
+        yield "split", (0, n)
+
+    # Transversales (calles) y trios con el cero
+    for row in range(12):
+        base = 3 * row + 1
+        yield "street", (base, base + 1, base + 2)
+    yield "street", (0, 1, 2)
+    yield "street", (0, 2, 3)
+
+    # Cuadros y primeros cuatro
+    for row in range(11):
+        base = 3 * row + 1
+        yield "corner", (base, base + 1, base + 3, base + 4)
+        yield "corner", (base + 1, base + 2, base + 4, base + 5)
+    yield "corner", (0, 1, 2, 3)
+
+    # Seisenas (doble calle)
+    for row in range(11):
+        base = 3 * row + 1
+        yield "six_line", tuple(range(base, base + 6))
+
+    # Docenas y columnas
+    for d in range(3):
+        yield "dozen", tuple(range(12 * d + 1, 12 * d + 13))
+    for c in range(1, 4):
+        yield "column", tuple(range(c, 37, 3))
+
+    # Suertes sencillas
+    yield "red", tuple(sorted(RED_NUMBERS))
+    yield "black", tuple(n for n in range(1, 37) if n not in RED_NUMBERS)
+    yield "odd", tuple(range(1, 37, 2))
+    yield "even", tuple(range(2, 37, 2))
+    yield "low", tuple(range(1, 19))
+    yield "high", tuple(range(19, 37))
+
+def _compile_layout():
+    """Compilar todas las apuestas legales una sola vez al importar el módulo"""
+    by_set = {}
+    for kind, numbers in _layout_groups():
+        numbers = tuple(sorted(numbers))
+        # Pago europeo: 36 / números cubiertos - 1 (35, 17, 11, 8, 5, 2, 1)
+        by_set[frozenset(numbers)] = LayoutBet(kind, numbers, 36 // len(numbers) - 1)
+    return by_set
+
+LAYOUT_BETS = _compile_layout()
+
+# Índice por texto canónico ("1, 2, 3"), el mismo formato que envía static/app.js
+_BY_TEXT = {", ".join(map(str, bet.numbers)): bet for bet in LAYOUT_BETS.values()}
+
+def lookup_bet(numbers: str) -> Optional[LayoutBet]:
+    """Buscar la apuesta legal que corresponde a una lista de números en texto"""
+    bet = _BY_TEXT.get(numbers)
+    if bet is not None:
+        return bet
+
+    # Camino lento: otro orden o separadores (p. ej. clientes de App Inventor)
+    try:
+        key = frozenset(int(x) for x in numbers.split(","))
+    except ValueError:
+        return None
+    return LAYOUT_BETS.get(key)
+
+def compile_bets(bets: Iterable) -> tuple:
+    """
+    Compilar una lista de BetItem en (vector de pagos de 37 posiciones, monto total).
+    payouts[n] es la ganancia (sin devolver la apuesta) si sale el número n;
+    el total es la suma de 'amt', lo que el giro debe cobrar.
+    Lanza InvalidBet si alguna apuesta no existe en el tapete o trae otro pago.
+    """
+    payouts = [0] * NUM_POCKETS
+    total = 0
+    for bet_item in bets:
+        layout = lookup_bet(bet_item.numbers)
+        if layout is None:
+            raise InvalidBet(f"Apuesta inválida: {bet_item.numbers}")
+        if bet_item.odds != layout.odds:
+            raise InvalidBet(f"Pago inválido para {bet_item.numbers}")
+        if bet_item.amt < 0:
+            raise InvalidBet("Monto de apuesta negativo")
+        total += bet_item.amt
+        win = layout.odds * bet_item.amt
+        if win:
+            for n in layout.numbers:
+                payouts[n] += win
+    return tuple(payouts), total
+
+def net_result(stake: int, win_value: int) -> int:
+    """
+    Variación del saldo tras un giro.
+    Si algo ganó se devuelve toda la apuesta más la ganancia; si no, se pierde la apuesta.
+    """
+    return win_value if win_value > 0 else -stake
+
+def play_spins(payouts, stake, balance, draw, count, stop_loss=None, stop_win=None):
+    """
+    Jugar hasta 'count' giros seguidos en memoria con el mismo vector de pagos.
+    Cada giro sigue las mismas reglas que un /api/spin individual; se detiene antes
+    de un giro que el saldo no cubre, o cuando la pérdida/ganancia acumulada
+    alcanza stop_loss/stop_win.
+    Devuelve [(numero_ganador, ganancia, saldo_resultante), ...].
+    """
+    start = balance
+    results = []
+    for _ in range(count):
+        if balance < stake:
+            break
+        winning = draw()
+        win_value = payouts[winning]
+        balance += net_result(stake, win_value)
+        results.append((winning, win_value, balance))
+        if stop_loss is not None and start - balance >= stop_loss:
+            break
+        if stop_win is not None and balance - start >= stop_win:
+            break
+    return results
@@ -0,0 +1,101 @@
+# serialization.py - Respuestas JSON rápidas (orjson) y MessagePack por negociación de contenido
+from decimal import Decimal
+
+import msgpack
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+def _default(value):
+    # Los saldos salen de la BD como Decimal; el cliente los espera como número
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada con orjson. Los endpoints calientes la devuelven ya armada
+    con tipos simples, así FastAPI no vuelve a validar ni pasar por jsonable_encoder;
+    response_model se mantiene solo para la documentación.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, default=_default)
+
+def _media_type(value: str) -> str:
+    return value.partition(";")[0].strip().lower()
+
+def _accepted_types(headers: Headers) -> dict:
+    """Tipos de Accept con su q (los de q=0 quedan fuera)"""
+    accepted = {}
+    for part in headers.get("accept", "").split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0 and name.strip():
+            accepted[name.strip().lower()] = q
+    return accepted
+
+def is_msgpack(headers: Headers) -> bool:
+    return _media_type(headers.get("content-type", "")) in MSGPACK_TYPES
+
+def wants_msgpack(headers: Headers) -> bool:
+    """MessagePack si Accept lo prefiere sobre JSON; sin preferencia, el mismo formato del request"""
+    accepted = _accepted_types(headers)
+    msgpack_q = max((accepted.get(t, 0) for t in MSGPACK_TYPES), default=0)
+    json_q = accepted.get("application/json", 0)
+    if msgpack_q or json_q:
+        return msgpack_q > json_q
+    return is_msgpack(headers)
+
+def negotiated_response(request: Request, content) -> Response:
+    if wants_msgpack(request.headers):
+        return MsgPackResponse(content, headers={"Vary": "Accept, Content-Type"})
+    return FastJSONResponse(content, headers={"Vary": "Accept, Content-Type"})
+
+def negotiated_body(model):
+    """
+    Dependencia que lee el body como JSON o MessagePack (según Content-Type)
+    y lo valida con 'model'. Los errores de validación responden 422 como siempre.
+    """
+    async def parse(request: Request):
+        body = await request.body()
+        try:
+            if is_msgpack(request.headers):
+                try:
+                    data = msgpack.unpackb(body)
+                except Exception:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Cuerpo MessagePack inválido"
+                    )
+                return model.model_validate(data)
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+
+    return parse
+
+def request_body_schema(model) -> dict:
+    """openapi_extra para documentar un body que acepta JSON y MessagePack"""
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    content = {"application/json": {"schema": schema}, MSGPACK_MEDIA_TYPE: {"schema": schema}}
+    return {"requestBody": {"required": True, "content": content}}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Servidor de producción: gunicorn con N workers de uvicorn y la app precargada.
+Ejecuta: python server.py
+
+Variables de entorno:
+    WEB_CONCURRENCY     workers (por defecto, los núcleos disponibles)
+    DB_MAX_CONNECTIONS  conexiones a PostgreSQL para todos los workers juntos (15, lo mismo
+                        que el proceso único); se reparten entre DB_POOL_SIZE y
+                        DB_MAX_OVERFLOW de cada worker
+    DRAIN_TIMEOUT       segundos que un worker espera a sus requests y giros al recibir SIGTERM
+    PORT                puerto (8000)
+    RATE_LIMIT_PROXY_HOPS  proxies delante de la app que agregan X-Forwarded-For (1 en Render,
+                        0 sin proxy); la IP de los límites de login es la que agregó el último
+"""
+
+import os
+
+# Mismos valores que app.py; se leen aquí antes de importar nada de la app
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "20"))
+# Presupuesto total de conexiones por defecto: el del proceso único (5 + 10 overflow)
+DEFAULT_MAX_CONNECTIONS = 15
+# Margen tras el drenado para el shutdown de la app (historial, estadísticas, saldos)
+SHUTDOWN_GRACE = 15
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _workers() -> int:
+    workers = int(os.getenv("WEB_CONCURRENCY") or _cpu_count())
+    if os.getenv("BALANCE_STORE", "").lower() == "memory" and workers > 1:
+        # balances.py es dueño de saldo_actual: dos procesos se pisarían los saldos
+        print(f"⚠️ BALANCE_STORE=memory requiere un solo proceso: usando 1 worker en lugar de {workers}")
+        return 1
+    return max(1, workers)
+
+def _configure_environment(workers: int):
+    """Variables que database.py, stats.py y ratelimit.py leen al importarse"""
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    # El total se reparte entre los workers (no se multiplica): un tercio permanente y el
+    # resto como overflow para los picos
+    max_connections = int(os.getenv("DB_MAX_CONNECTIONS") or DEFAULT_MAX_CONNECTIONS)
+    if max_connections < workers:
+        print(f"⚠️ DB_MAX_CONNECTIONS={max_connections} no alcanza para {workers} workers: "
+              f"usando 1 conexión por worker ({workers} en total)")
+    per_worker = max(1, max_connections // workers)
+    pool_size = max(1, per_worker // 3)
+    os.environ.setdefault("DB_POOL_SIZE", str(pool_size))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(max(0, per_worker - pool_size)))
+
+    if workers > 1:
+        # Cada worker solo ve sus propios giros: los leaderboards se recargan de la BD
+        os.environ.setdefault("STATS_REFRESH_SECONDS", "30")
+        if not os.getenv("RATE_LIMIT_REDIS_URL"):
+            print(f"⚠️ Sin RATE_LIMIT_REDIS_URL los límites de login son por worker (hasta {workers}x)")
+        print("⚠️ Las mesas compartidas (/ws/game) son por worker: los jugadores de una mesa "
+              "solo se ven si caen en el mismo proceso")
+
+try:
+    from uvicorn.workers import UvicornWorker
+except ImportError:
+    UvicornWorker = None
+
+if UvicornWorker is not None:
+    class RuletaWorker(UvicornWorker):
+        # Tras SIGTERM uvicorn deja de aceptar conexiones y espera los requests en curso
+        # hasta DRAIN_TIMEOUT; luego corre el shutdown de la app (que espera los giros)
+        CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": DRAIN_TIMEOUT}
+
+def main():
+    workers = _workers()
+    _configure_environment(workers)
+    port = int(os.getenv("PORT", 8000))
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn no corre en Windows: un solo proceso de uvicorn
+        import uvicorn
+        print("⚠️ gunicorn no está disponible: iniciando un solo proceso de uvicorn")
+        uvicorn.run("app:app", host="0.0.0.0", port=port, timeout_graceful_shutdown=DRAIN_TIMEOUT)
+        return
+
+    class RuletaServer(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"0.0.0.0:{port}",
+                "workers": workers,
+                "worker_class": "server.RuletaWorker",
+                # Importar la app una vez en el master: los workers comparten el código
+                # (copy-on-write). El engine de la BD se crea en cada worker al primer uso,
+                # así ninguna conexión cruza el fork.
+                "preload_app": True,
+                "graceful_timeout": int(DRAIN_TIMEOUT + SHUTDOWN_GRACE),
+                "keepalive": 5,
+                "accesslog": None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    print(f"🚀 Iniciando {workers} worker(s) en el puerto {port}")
+    RuletaServer().run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Simulador Monte-Carlo vectorizado (NumPy) del motor de pagos de /api/spin
+Calcula RTP, varianza, frecuencia de acierto y curvas de supervivencia del bankroll
+usando la misma tabla de apuestas (roulette.py) y la misma regla de liquidación
+("si algo gana se devuelve toda la apuesta").
+
+Ejemplos:
+  python simulator.py --bet red:10 --spins 50000000
+  python simulator.py --bet 17:5 --bet "1, 2, 4, 5:10" --bet dozen2:20
+  python simulator.py --slip apuestas.json --sessions 10000 --session-spins 500 --bankroll 500
+
+Requiere NumPy (pip install numpy); el servidor no lo necesita.
+"""
+
+import argparse
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from roulette import LAYOUT_BETS, NUM_POCKETS, WHEEL_ORDER, compile_bets, net_result
+
+BATCH_SIZE = 1 << 22
+
+def _named_bets():
+    """Nombres cortos para apuestas exteriores: red, black, odd, even, low, high, dozen1..3, column1..3"""
+    names = {}
+    for bet in LAYOUT_BETS.values():
+        if bet.kind in ("red", "black", "odd", "even", "low", "high"):
+            names[bet.kind] = bet
+        elif bet.kind == "dozen":
+            names[f"dozen{bet.numbers[0] // 12 + 1}"] = bet
+        elif bet.kind == "column":
+            names[f"column{bet.numbers[0]}"] = bet
+    return names
+
+def parse_bet(spec: str):
+    """Convertir 'red:10' o '1, 2:5' en un BetItem equivalente al que envía el frontend"""
+    target, _, amt = spec.rpartition(":")
+    if not target:
+        raise argparse.ArgumentTypeError(f"Formato esperado NOMBRE_O_NUMEROS:MONTO, recibido {spec!r}")
+    layout = _named_bets().get(target.strip().lower())
+    if layout is not None:
+        numbers = ", ".join(map(str, layout.numbers))
+        odds = layout.odds
+    else:
+        numbers = target
+        odds = None
+        try:
+            key = frozenset(int(x) for x in target.split(","))
+        except ValueError:
+            key = None
+        if key in LAYOUT_BETS:
+            odds = LAYOUT_BETS[key].odds
+        else:
+            raise argparse.ArgumentTypeError(f"Apuesta inválida: {target}")
+    return SimpleNamespace(amt=int(amt), odds=odds, numbers=numbers, type="sim")
+
+def load_slip(path: str):
+    """Leer un bet slip en JSON con el mismo formato que 'bets' de /api/spin"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data["bets"]
+    return [SimpleNamespace(**item) for item in data]
+
+def net_vector(bets):
+    """Vector de 37 posiciones con la variación de saldo para cada número ganador"""
+    payouts, stake = compile_bets(bets)
+    net = np.array([net_result(stake, payouts[n]) for n in range(NUM_POCKETS)], dtype=np.int64)
+    return stake, np.array(payouts, dtype=np.int64), net
+
+def simulate_totals(spins, rng):
+    """
+    Simular 'spins' giros por lotes. Solo se guarda el histograma de números ganadores:
+    con él se obtienen exactamente suma, suma de cuadrados y aciertos.
+    """
+    counts = np.zeros(NUM_POCKETS, dtype=np.int64)
+    remaining = spins
+    while remaining:
+        n = min(remaining, BATCH_SIZE)
+        draws = rng.integers(0, NUM_POCKETS, size=n, dtype=np.uint8)
+        counts += np.bincount(draws, minlength=NUM_POCKETS)
+        remaining -= n
+    return counts
+
+def simulate_sessions(net, stake, sessions, session_spins, bankroll, rng):
+    """
+    Curva de supervivencia: fracción de sesiones que aún pueden apostar tras t giros.
+    Una sesión termina cuando el bankroll no alcanza para la apuesta completa.
+    """
+    alive = np.zeros(session_spins + 1, dtype=np.int64)
+    rows = max(1, BATCH_SIZE // max(session_spins, 1))
+    remaining = sessions
+    while remaining:
+        n = min(remaining, rows)
+        draws = rng.integers(0, NUM_POCKETS, size=(n, session_spins), dtype=np.uint8)
+        path = bankroll + np.cumsum(net[draws], axis=1)
+        # Antes del giro t se necesita bankroll >= stake (el giro 0 empieza con 'bankroll')
+        before = np.concatenate([np.full((n, 1), bankroll, dtype=np.int64), path], axis=1)
+        broke = before < stake
+        ruined_at = np.where(broke.any(axis=1), broke.argmax(axis=1), session_spins + 1)
+        # Sesiones que siguen jugando en el giro t: las arruinadas en un índice > t
+        ruined = np.cumsum(np.bincount(ruined_at, minlength=session_spins + 2))
+        alive += n - ruined[:session_spins + 1]
+        remaining -= n
+    return alive / sessions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador Monte-Carlo de la ruleta europea")
+    parser.add_argument("--bet", action="append", type=parse_bet, default=[],
+                        help="NOMBRE_O_NUMEROS:MONTO (red:10, 17:5, '1, 2:5', dozen1:20)")
+    parser.add_argument("--slip", help="Archivo JSON con la lista 'bets' de /api/spin")
+    parser.add_argument("--spins", type=int, default=10_000_000)
+    parser.add_argument("--sessions", type=int, default=0, help="Sesiones para la curva de supervivencia")
+    parser.add_argument("--session-spins", type=int, default=200)
+    parser.add_argument("--bankroll", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    bets = list(args.bet)
+    if args.slip:
+        bets.extend(load_slip(args.slip))
+    if not bets:
+        bets = [parse_bet("red:10")]
+
+    stake, payouts, net = net_vector(bets)
+    if stake <= 0:
+        parser.error("La apuesta total debe ser mayor que cero")
+    rng = np.random.default_rng(args.seed)
+
+    print("=" * 60)
+    print("SIMULADOR MONTE-CARLO - RULETA EUROPEA")
+    print("=" * 60)
+    print(f"Rueda:       {len(WHEEL_ORDER)} casillas")
+    print(f"Apuestas:    {len(bets)}  |  Apuesta total por giro: {stake}")
+
+    # Valores teóricos (rueda justa, 37 casillas equiprobables)
+    ev = net.mean()
+    print(f"RTP teórico: {1 + ev / stake:.6%}  |  Ventaja de la casa: {-ev / stake:.4%}")
+
+    start = time.perf_counter()
+    counts = simulate_totals(args.spins, rng)
+    elapsed = time.perf_counter() - start
+
+    total = int(counts @ net)
+    mean = total / args.spins
+    variance = float(counts @ (net.astype(np.float64) ** 2)) / args.spins - mean ** 2
+    hits = int(counts[payouts > 0].sum())
+
+    print("-" * 60)
+    print(f"Giros simulados:       {args.spins:,}")
+    print(f"RTP simulado:          {1 + mean / stake:.6%}")
+    print(f"Resultado medio/giro:  {mean:+.4f}")
+    print(f"Varianza/giro:         {variance:.4f}  (desv. {variance ** 0.5:.4f})")
+    print(f"Frecuencia de acierto: {hits / args.spins:.4%}")
+    print(f"Throughput:            {args.spins / elapsed / 1e6:,.1f} M giros/s")
+
+    if args.sessions:
+        curve = simulate_sessions(net, stake, args.sessions, args.session_spins, args.bankroll, rng)
+        print("-" * 60)
+        print(f"SUPERVIVENCIA: {args.sessions:,} sesiones, bankroll {args.bankroll}")
+        step = max(1, args.session_spins // 10)
+        for t in range(0, args.session_spins + 1, step):
+            print(f"  giro {t:6d}: {curve[t]:.2%} siguen jugando")
+
+    print("=" * 60)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
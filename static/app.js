@@ -501,28 +501,38 @@ async function spin() {
 		// Capturar apuesta actual antes de cualquier cambio
 		let spinBet = currentBet;
 
-		// Llamar al backend para calcular el spin
-		const response = await fetch('/api/spin', {
-			method: 'POST',
-			headers: {
-				'Content-Type': 'application/json'
-			},
-			credentials: 'include', // Enviar cookies automáticamente
-			body: JSON.stringify({
-				balance: bankValue,
-				currentBet: spinBet,
-				bets: bet,
-				numbersBet: numbersBet
-			})
-		});
-
-		if (!response.ok) {
-			const error = await response.json();
-			alert(error.detail || 'Error en el servidor');
+		// Usar el WebSocket del juego si está abierto (db-integration.js)
+		let data = (typeof spinOverSocket === 'function') ? await spinOverSocket(spinBet, bet) : null;
+
+		if (data && data.type === 'error') {
+			alert(data.detail || 'Error en el servidor');
 			return;
 		}
 
-		const data = await response.json();
+		if (!data) {
+			// Llamar al backend para calcular el spin
+			const response = await fetch('/api/spin', {
+				method: 'POST',
+				headers: {
+					'Content-Type': 'application/json'
+				},
+				credentials: 'include', // Enviar cookies automáticamente
+				body: JSON.stringify({
+					balance: bankValue,
+					currentBet: spinBet,
+					bets: bet,
+					numbersBet: numbersBet
+				})
+			});
+
+			if (!response.ok) {
+				const error = await response.json();
+				alert(error.detail || 'Error en el servidor');
+				return;
+			}
+
+			data = await response.json();
+		}
 		const winningSpin = data.winningSpin;
 		const winValue = data.winValue;
 		const newBalance = data.newBalance;
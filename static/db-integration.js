@@ -40,5 +40,62 @@ function updateBalance() {
     }
 }
 
+// ========================================================
+// CANAL WEBSOCKET DEL JUEGO (/ws/game)
+// Un solo handshake y autenticación para toda la sesión
+// ========================================================
+
+let gameSocket = null;
+let pendingSpin = null;
+
+function connectGameSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws/game`);
+    let opened = false;
+
+    ws.onopen = function () {
+        opened = true;
+        gameSocket = ws;
+        console.log('✅ Canal de juego conectado');
+    };
+
+    ws.onmessage = function (event) {
+        const msg = JSON.parse(event.data);
+        if (msg.type === 'saldo') {
+            bankValue = msg.saldo;
+            updateBalance();
+        } else if (pendingSpin) {
+            const resolve = pendingSpin;
+            pendingSpin = null;
+            resolve(msg);
+        }
+    };
+
+    ws.onclose = function () {
+        gameSocket = null;
+        if (pendingSpin) {
+            const resolve = pendingSpin;
+            pendingSpin = null;
+            resolve(null);  // el spin usará fetch como respaldo
+        }
+        // Reconectar solo si llegó a autenticarse (sin sesión se usa HTTP)
+        if (opened) {
+            setTimeout(connectGameSocket, 2000);
+        }
+    };
+}
+
+// Enviar un spin por el WebSocket; devuelve null si el canal no está disponible
+function spinOverSocket(currentBet, bets) {
+    if (!gameSocket || gameSocket.readyState !== WebSocket.OPEN || pendingSpin) {
+        return Promise.resolve(null);
+    }
+    return new Promise(function (resolve) {
+        pendingSpin = resolve;
+        gameSocket.send(JSON.stringify({ type: 'spin', currentBet: currentBet, bets: bets }));
+    });
+}
+
 // Cargar saldo al iniciar la página
 loadBalanceFromDB();
+connectGameSocket();
@@ -0,0 +1,100 @@
+# static_assets.py - Archivos estáticos precomprimidos y con huella de contenido
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat
+
+import anyio
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+# Carpeta generada por build_assets.py (relativa a static/)
+DIST_DIR = "dist"
+MANIFEST_PATH = os.path.join("static", DIST_DIR, "manifest.json")
+
+# Los nombres con hash nunca cambian de contenido: caché de un año
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Variantes precomprimidas en orden de preferencia
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def _accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que, para archivos de dist/, sirve la variante .br o .gz según
+    Accept-Encoding con Cache-Control immutable. El resto se revalida con ETag.
+    """
+
+    async def get_response(self, path, scope):
+        immutable = path.replace(os.sep, "/").startswith(DIST_DIR + "/")
+
+        if immutable and scope["method"] in ("GET", "HEAD"):
+            accepted = _accepted_encodings(Headers(scope=scope))
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    response = self.file_response(full_path, stat_result, scope)
+                    media_type, _ = mimetypes.guess_type(path)
+                    response.headers["content-type"] = media_type or "application/octet-stream"
+                    response.headers["content-encoding"] = encoding
+                    response.headers["vary"] = "Accept-Encoding"
+                    response.headers["cache-control"] = IMMUTABLE
+                    return response
+
+        response = await super().get_response(path, scope)
+        if immutable:
+            response.headers["vary"] = "Accept-Encoding"
+            response.headers["cache-control"] = IMMUTABLE
+        else:
+            response.headers.setdefault("cache-control", "no-cache")
+        return response
+
+class CachedPage:
+    """
+    Página HTML cargada una sola vez en memoria, con ETag precalculado y cuerpos
+    gzip/brotli listos; responde 304 a peticiones condicionales.
+    """
+
+    def __init__(self, path: str, media_type: str = "text/html; charset=utf-8"):
+        with open(path, "rb") as f:
+            body = f.read()
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.media_type = media_type
+        self.bodies = {
+            "br": brotli.compress(body, quality=11),
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            "identity": body,
+        }
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.bodies}
+
+    def response(self, headers: Headers, conditional: bool = True) -> Response:
+        accepted = _accepted_encodings(headers)
+        encoding = next((name for name, _ in ENCODINGS if name in accepted), "identity")
+        etag = self.etags[encoding]
+        response_headers = {"etag": etag, "vary": "Accept-Encoding", "cache-control": "no-cache"}
+
+        if conditional:
+            tags = [tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",")]
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=response_headers)
+
+        if encoding != "identity":
+            response_headers["content-encoding"] = encoding
+        return Response(self.bodies[encoding], media_type=self.media_type, headers=response_headers)
@@ -0,0 +1,278 @@
+# stats.py - Estadísticas de jugadores y leaderboards mantenidos incrementalmente
+import asyncio
+import heapq
+import os
+from decimal import Decimal
+from operator import itemgetter
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import SessionLocal
+from models import EstadisticaJugador, EstadisticaNumero, Saldo, Usuario
+from roulette import NUM_POCKETS, lookup_bet
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "50"))
+# Con varios workers cada uno solo ve sus propios giros: recargar desde la BD cada N segundos
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "0"))
+
+# Apuestas de hasta 6 números (plenos, splits, calles, cuadros, líneas) definen los favoritos
+INSIDE_MAX_NUMBERS = 6
+
+_NEG_INF = float("-inf")
+
+class TopK:
+    """
+    Los K mayores valores de un dict que sube y baja (p. ej. saldos).
+    Guarda 2K candidatos y una cota de todo lo que quedó fuera; solo se reconstruye
+    desde 'source' (O(n)) cuando esa cota alcanza al K-ésimo candidato.
+    Leer cuesta O(K log K) y actualizar O(1) salvo al desplazar un candidato (O(K)).
+    """
+
+    def __init__(self, k: int, source: dict):
+        self.k = k
+        self.capacity = 2 * k
+        self.source = source
+        self.rebuild()
+
+    def rebuild(self):
+        best = heapq.nlargest(self.capacity, self.source.items(), key=itemgetter(1))
+        self.candidates = dict(best)
+        # Todo lo que no es candidato vale como mucho 'bound'
+        self.bound = best[-1][1] if len(self.source) > len(best) else _NEG_INF
+
+    def update(self, key, value):
+        candidates = self.candidates
+        if key in candidates:
+            candidates[key] = value
+            return
+        if value <= self.bound:
+            return
+        candidates[key] = value
+        if len(candidates) > self.capacity:
+            evicted = min(candidates, key=candidates.__getitem__)
+            self.bound = max(self.bound, candidates.pop(evicted))
+
+    def top(self, limit: int) -> list:
+        limit = min(limit, self.k)
+        best = heapq.nlargest(limit, self.candidates.items(), key=itemgetter(1))
+        if (len(best) < limit and self.bound != _NEG_INF) or (best and best[-1][1] < self.bound):
+            self.rebuild()
+            best = heapq.nlargest(limit, self.candidates.items(), key=itemgetter(1))
+        return best
+
+class PlayerStats:
+    __slots__ = ("giros", "total_apostado", "total_ganado", "mayor_ganancia", "numeros")
+
+    def __init__(self):
+        self.giros = 0
+        self.total_apostado = Decimal(0)
+        self.total_ganado = Decimal(0)
+        self.mayor_ganancia = Decimal(0)
+        self.numeros = [Decimal(0)] * NUM_POCKETS
+
+    def favoritos(self, limit: int = 5) -> list:
+        best = heapq.nlargest(limit, range(NUM_POCKETS), key=self.numeros.__getitem__)
+        return [n for n in best if self.numeros[n] > 0]
+
+class StatsBook:
+    """
+    Agregados por jugador en memoria, actualizados en cada giro liquidado (desde el ledger)
+    y persistidos como incrementos (upsert aditivo) en la misma transacción que el historial.
+    Los leaderboards se leen de dos TopK sin recorrer las tablas.
+    """
+
+    def __init__(self, session_factory=SessionLocal, k=LEADERBOARD_SIZE, refresh_seconds=STATS_REFRESH_SECONDS):
+        self.session_factory = session_factory
+        self.k = k
+        self.refresh_seconds = refresh_seconds
+        self._reset({}, {}, {}, {})
+        self._pending = {}          # id_usuario -> [giros, apostado, ganado, mayor]
+        self._pending_numbers = {}  # (id_usuario, numero) -> monto
+        self._task = None
+
+    def _reset(self, players, balances, names, best_wins):
+        self.players = players
+        self.balances = balances
+        self.names = names
+        self.best_wins = best_wins
+        self.top_balances = TopK(self.k, self.balances)
+        self.top_wins = TopK(self.k, self.best_wins)
+
+    # ----- registro de giros -----
+
+    def record(self, id_usuario, apuestas, stake: Decimal, win_value: Decimal, balance: Decimal):
+        """Sumar un giro liquidado (sin I/O); ganancia = win_value"""
+        player = self.players.get(id_usuario)
+        if player is None:
+            player = self.players[id_usuario] = PlayerStats()
+        player.giros += 1
+        player.total_apostado += stake
+        player.total_ganado += win_value
+        if win_value > player.mayor_ganancia:
+            player.mayor_ganancia = win_value
+            self.best_wins[id_usuario] = win_value
+            self.top_wins.update(id_usuario, win_value)
+        self.balances[id_usuario] = balance
+        self.top_balances.update(id_usuario, balance)
+
+        pending = self._pending.get(id_usuario)
+        if pending is None:
+            pending = self._pending[id_usuario] = [0, Decimal(0), Decimal(0), Decimal(0)]
+        pending[0] += 1
+        pending[1] += stake
+        pending[2] += win_value
+        pending[3] = max(pending[3], win_value)
+
+        for bet in apuestas:
+            layout = lookup_bet(bet["numbers"])
+            if layout is None or len(layout.numbers) > INSIDE_MAX_NUMBERS:
+                continue
+            amt = Decimal(bet["amt"])
+            for n in layout.numbers:
+                player.numeros[n] += amt
+                key = (id_usuario, n)
+                self._pending_numbers[key] = self._pending_numbers.get(key, 0) + amt
+
+    # ----- persistencia -----
+
+    def take_pending(self):
+        pending, self._pending = self._pending, {}
+        numbers, self._pending_numbers = self._pending_numbers, {}
+        return pending, numbers
+
+    def restore_pending(self, taken):
+        """Devolver incrementos no escritos (fallo de la transacción) para el siguiente intento"""
+        pending, numbers = taken
+        for id_usuario, (giros, apostado, ganado, mayor) in pending.items():
+            current = self._pending.setdefault(id_usuario, [0, Decimal(0), Decimal(0), Decimal(0)])
+            current[0] += giros
+            current[1] += apostado
+            current[2] += ganado
+            current[3] = max(current[3], mayor)
+        for key, monto in numbers.items():
+            self._pending_numbers[key] = self._pending_numbers.get(key, 0) + monto
+
+    async def write(self, db, taken):
+        """Upsert aditivo de los incrementos (sin commit: va en la transacción del ledger)"""
+        pending, numbers = taken
+        if not pending and not numbers:
+            return
+        pg = db.bind.dialect.name == "postgresql"
+        insert = postgresql.insert if pg else sqlite.insert
+        greatest = func.greatest if pg else func.max
+
+        if pending:
+            t = EstadisticaJugador.__table__
+            stmt = insert(t)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[t.c.id_usuario],
+                set_={
+                    "giros": t.c.giros + stmt.excluded.giros,
+                    "total_apostado": t.c.total_apostado + stmt.excluded.total_apostado,
+                    "total_ganado": t.c.total_ganado + stmt.excluded.total_ganado,
+                    "mayor_ganancia": greatest(t.c.mayor_ganancia, stmt.excluded.mayor_ganancia),
+                },
+            )
+            await db.execute(stmt, [
+                {"id_usuario": id_usuario, "giros": giros, "total_apostado": apostado,
+                 "total_ganado": ganado, "mayor_ganancia": mayor}
+                for id_usuario, (giros, apostado, ganado, mayor) in sorted(pending.items())
+            ])
+
+        if numbers:
+            t = EstadisticaNumero.__table__
+            stmt = insert(t)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[t.c.id_usuario, t.c.numero],
+                set_={"monto": t.c.monto + stmt.excluded.monto},
+            )
+            await db.execute(stmt, [
+                {"id_usuario": id_usuario, "numero": numero, "monto": monto}
+                for (id_usuario, numero), monto in sorted(numbers.items())
+            ])
+
+    async def load(self):
+        """Cargar agregados, saldos y nombres (una lectura completa al iniciar o al refrescar)"""
+        players, best_wins = {}, {}
+        async with self.session_factory() as db:
+            for row in (await db.execute(select(EstadisticaJugador))).scalars():
+                player = players[row.id_usuario] = PlayerStats()
+                player.giros = row.giros
+                player.total_apostado = row.total_apostado
+                player.total_ganado = row.total_ganado
+                player.mayor_ganancia = row.mayor_ganancia
+                if row.mayor_ganancia > 0:
+                    best_wins[row.id_usuario] = row.mayor_ganancia
+            for id_usuario, numero, monto in await db.execute(
+                select(EstadisticaNumero.id_usuario, EstadisticaNumero.numero, EstadisticaNumero.monto)
+            ):
+                if id_usuario in players:
+                    players[id_usuario].numeros[numero] = monto
+            balances = dict((await db.execute(select(Saldo.id_usuario, Saldo.saldo_actual))).all())
+            names = {
+                id_usuario: _display_name(nombre, apellido)
+                for id_usuario, nombre, apellido in await db.execute(
+                    select(Usuario.id_usuario, Usuario.nombre, Usuario.apellido)
+                )
+            }
+        self._reset(players, balances, names, best_wins)
+
+    def set_balances(self, balances: dict):
+        """Saldos que cambiaron fuera de los giros (altas y abonos masivos)"""
+        for id_usuario, balance in balances.items():
+            self.balances[id_usuario] = balance
+            self.top_balances.update(id_usuario, balance)
+
+    # ----- lectura -----
+
+    def player(self, id_usuario: int):
+        return self.players.get(id_usuario)
+
+    async def leaderboard(self, kind: str, limit: int) -> list:
+        topk = self.top_balances if kind == "saldo" else self.top_wins
+        best = topk.top(limit)
+        missing = [id_usuario for id_usuario, _ in best if id_usuario not in self.names]
+        if missing:
+            # Jugadores registrados después de la carga: solo se consultan sus nombres (≤ K)
+            async with self.session_factory() as db:
+                rows = await db.execute(
+                    select(Usuario.id_usuario, Usuario.nombre, Usuario.apellido)
+                    .where(Usuario.id_usuario.in_(missing))
+                )
+                for id_usuario, nombre, apellido in rows:
+                    self.names[id_usuario] = _display_name(nombre, apellido)
+        return [(self.names.get(id_usuario, ""), value) for id_usuario, value in best]
+
+    # ----- ciclo de vida -----
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"❌ Error recargando estadísticas: {e}")
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"❌ Error cargando estadísticas: {e}")
+        if self.refresh_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+def _display_name(nombre: str, apellido: str) -> str:
+    """Nombre público: "Ana P." (sin apellido completo ni email)"""
+    return f"{nombre} {apellido[:1]}." if apellido else nombre
+
+player_stats = StatsBook()
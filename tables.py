@@ -0,0 +1,179 @@
+# tables.py - Mesas compartidas: un número ganador por ronda para todos los jugadores
+import asyncio
+import json
+import os
+from decimal import Decimal
+
+from database import SessionLocal
+from ledger import spin_ledger
+from metrics import record_spin
+from rng import wheel_rng
+from roulette import NUM_POCKETS, color_of, net_result
+from wallet import settle_round, spins_in_flight
+
+TABLE_NAMES = [name.strip() for name in os.getenv("TABLES", "principal").split(",") if name.strip()]
+BETTING_WINDOW = float(os.getenv("TABLE_BETTING_WINDOW", "15"))
+# Apuestas (casillas) que un jugador puede acumular en una ronda con mensajes "bet"
+MAX_ROUND_BETS = int(os.getenv("TABLE_MAX_ROUND_BETS", "200"))
+
+class TableBet:
+    """Apuestas acumuladas de un jugador en la ronda actual"""
+    __slots__ = ("stake", "payouts", "bets")
+
+    def __init__(self):
+        self.stake = 0
+        self.payouts = [0] * NUM_POCKETS
+        self.bets = []
+
+    def add(self, stake, payouts, bets):
+        self.stake += stake
+        for n in range(NUM_POCKETS):
+            self.payouts[n] += payouts[n]
+        self.bets.extend(bets)
+
+class Table:
+    """
+    Mesa con ventana de apuestas fija. Al cerrar la ventana se sortea un solo número,
+    se liquidan todas las apuestas con un UPDATE masivo y se difunde el resultado.
+    El costo por ronda depende del número de mesas, no del de jugadores.
+    """
+
+    def __init__(self, name, betting_window=BETTING_WINDOW):
+        self.name = name
+        self.betting_window = betting_window
+        self.round = 1          # ronda con la ventana de apuestas abierta
+        self.subscribers = {}   # outbox (asyncio.Queue) -> id_usuario
+        self.pending = {}       # id_usuario -> TableBet
+        self._task = None
+        self._settling = False
+        self._closing = False
+
+    # ----- suscriptores -----
+
+    def join(self, id_usuario, outbox):
+        self.subscribers[outbox] = id_usuario
+
+    def leave(self, outbox):
+        self.subscribers.pop(outbox, None)
+
+    def _send(self, outbox, message):
+        """Encolar sin esperar; un cliente que no lee se desconecta de la mesa"""
+        try:
+            outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            self.leave(outbox)
+
+    def broadcast(self, message):
+        # Serializar una sola vez para todos los suscriptores
+        payload = json.dumps(message)
+        for outbox in list(self.subscribers):
+            self._send(outbox, payload)
+
+    # ----- apuestas -----
+
+    def place_bet(self, id_usuario, stake, payouts, bets):
+        """
+        Agregar apuestas del jugador a la ronda abierta; se cobran al cerrar la ronda.
+        Devuelve None (y no agrega nada) si superaría MAX_ROUND_BETS.
+        """
+        table_bet = self.pending.get(id_usuario)
+        if len(bets) + (len(table_bet.bets) if table_bet else 0) > MAX_ROUND_BETS:
+            return None
+        if table_bet is None:
+            table_bet = self.pending[id_usuario] = TableBet()
+        table_bet.add(stake, payouts, bets)
+        return self.round
+
+    # ----- rondas -----
+
+    async def _settle(self, winning, bets_by_user):
+        rows = [
+            (id_usuario, Decimal(bet.stake), Decimal(net_result(bet.stake, bet.payouts[winning])))
+            for id_usuario, bet in bets_by_user.items()
+        ]
+        async with SessionLocal() as db:
+            return await settle_round(db, rows)
+
+    async def play_round(self):
+        round_id = self.round
+        self.broadcast({"type": "round_open", "table": self.name, "round": round_id,
+                        "closesIn": self.betting_window})
+        await asyncio.sleep(self.betting_window)
+
+        # Desde el cierre hasta el historial la ronda no se cancela (stop() espera a que termine)
+        self._settling = True
+        try:
+            with spins_in_flight:
+                await self._close_round(round_id)
+        finally:
+            self._settling = False
+
+    async def _close_round(self, round_id):
+        # Cerrar la ventana: las apuestas que lleguen ahora van a la siguiente ronda
+        bets_by_user, self.pending = self.pending, {}
+        self.round += 1
+        winning = wheel_rng.spin()
+
+        balances = {}
+        settled = True
+        if bets_by_user:
+            try:
+                balances = await self._settle(winning, bets_by_user)
+            except Exception as e:
+                print(f"❌ Error liquidando ronda {round_id} de la mesa {self.name}: {e}")
+                settled = False
+
+        self.broadcast({"type": "round_result", "table": self.name, "round": round_id,
+                        "winningSpin": winning, "color": color_of(winning)})
+
+        # Resultado individual solo para quienes apostaron
+        for outbox, id_usuario in list(self.subscribers.items()):
+            bet = bets_by_user.get(id_usuario)
+            if bet is None:
+                continue
+            if not settled:
+                # No se cobró nada: el jugador sabe que su apuesta no jugó
+                self._send(outbox, {"type": "error", "status": 503, "round": round_id,
+                                    "detail": "No se pudo liquidar la ronda; la apuesta no se cobró"})
+                continue
+            new_balance = balances.get(id_usuario)
+            if new_balance is None:
+                self._send(outbox, {"type": "error", "status": 400, "round": round_id,
+                                    "detail": "Saldo insuficiente"})
+                continue
+            self._send(outbox, {"type": "spin", "round": round_id, "winningSpin": winning,
+                                "winValue": bet.payouts[winning], "newBalance": float(new_balance)})
+
+        for id_usuario, new_balance in balances.items():
+            bet = bets_by_user[id_usuario]
+            record_spin(bet.stake, bet.payouts[winning])
+            spin_ledger.record(id_usuario, bet.bets, winning, Decimal(bet.stake),
+                               Decimal(bet.payouts[winning]), new_balance)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await self.play_round()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error en la mesa {self.name}: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancelar la ventana de apuestas abierta (no se ha cobrado nada) o esperar la liquidación en curso"""
+        if self._task is not None:
+            self._closing = True
+            if not self._settling:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+tables = {name: Table(name) for name in TABLE_NAMES}
@@ -4,9 +4,22 @@ Script de prueba local para verificar la conexión a PostgreSQL
 Ejecuta este script para validar tu configuración antes de desplegar
 """
 
+import asyncio
 import os
 import sys
 
+def run_db(coro):
+    """Ejecutar una corrutina de BD y cerrar el pool (cada asyncio.run usa su propio loop)"""
+    from database import engine
+    
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+    
+    return asyncio.run(_main())
+
 def test_imports():
     """Verificar que todas las dependencias estén instaladas"""
     print("=" * 60)
@@ -17,7 +30,7 @@ def test_imports():
         ("fastapi", "FastAPI"),
         ("uvicorn", "Uvicorn"),
         ("sqlalchemy", "SQLAlchemy"),
-        ("psycopg2", "psycopg2-binary"),
+        ("asyncpg", "asyncpg"),
         ("jose", "python-jose"),
         ("passlib", "passlib"),
     ]
@@ -70,7 +83,7 @@ def test_database_connection():
     
     try:
         from database import test_connection
-        if test_connection():
+        if run_db(test_connection()):
             print("✅ Conexión exitosa a PostgreSQL")
             return True
         else:
@@ -90,9 +103,12 @@ def test_tables():
         from database import engine
         from sqlalchemy import inspect
         
-        inspector = inspect(engine)
+        async def listar_tablas():
+            async with engine.connect() as conn:
+                return await conn.run_sync(lambda c: inspect(c).get_table_names())
+        
         tablas_requeridas = ['rol', 'usuario', 'saldo']
-        tablas_existentes = inspector.get_table_names()
+        tablas_existentes = run_db(listar_tablas())
         
         for tabla in tablas_requeridas:
             if tabla in tablas_existentes:
@@ -115,13 +131,17 @@ def test_models():
     try:
         from models import Usuario, Rol, Saldo
         from database import SessionLocal
+        from sqlalchemy import func, select
         
-        db = SessionLocal()
+        async def contar():
+            async with SessionLocal() as db:
+                return [
+                    await db.scalar(select(func.count()).select_from(modelo))
+                    for modelo in (Rol, Usuario, Saldo)
+                ]
         
         # Contar registros
-        num_roles = db.query(Rol).count()
-        num_usuarios = db.query(Usuario).count()
-        num_saldos = db.query(Saldo).count()
+        num_roles, num_usuarios, num_saldos = run_db(contar())
         
         print(f"✅ Roles en BD: {num_roles}")
         print(f"✅ Usuarios en BD: {num_usuarios}")
@@ -130,7 +150,6 @@ def test_models():
         if num_usuarios == 0:
             print("\n⚠️ No hay usuarios creados. Usa test_password.py para crear uno.")
         
-        db.close()
         return True
     except Exception as e:
         print(f"❌ Error en modelos ORM: {e}")
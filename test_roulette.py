@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor de apuestas (roulette.py)
+Ejecuta: python -m pytest test_roulette.py
+"""
+
+import itertools
+import random
+from typing import NamedTuple
+
+import pytest
+
+from roulette import (
+    NUM_POCKETS, InvalidBet, compile_bets, lookup_bet, net_result, play_spins,
+)
+
+class Bet(NamedTuple):
+    """Mismos campos que BetItem de app.py, sin depender de la app"""
+    amt: int
+    type: str
+    odds: int
+    numbers: str
+
+def _text(*numbers):
+    return ", ".join(map(str, numbers))
+
+def app_js_bets():
+    """Todas las apuestas (tipo, números, pago) que puede enviar static/app.js"""
+    bets = [("zero", "0", 35)]
+    bets += [("inside_whole", str(n), 35) for n in range(1, 37)]
+    # Seisenas
+    bets += [("double_street", _text(*range(1 + 3 * j, 7 + 3 * j)), 5) for j in range(11)]
+    # Caballos horizontales y calles
+    for j in range(12):
+        bets.append(("split", _text(2 + 3 * j, 3 + 3 * j), 17))
+        bets.append(("split", _text(1 + 3 * j, 2 + 3 * j), 17))
+        bets.append(("street", _text(1 + 3 * j, 2 + 3 * j, 3 + 3 * j), 11))
+    # Caballos verticales
+    for d in range(1, 12):
+        for j in range(1, 4):
+            n = 3 + 3 * (d - 1) - (j - 1)
+            bets.append(("split", _text(n, n + 3), 17))
+    # Cuadros
+    for count in range(1, 23):
+        k = count - 1 if count < 12 else count - 12
+        first = 2 if count < 12 else 1
+        bets.append(("corner_bet", _text(first + 3 * k, first + 1 + 3 * k, first + 3 + 3 * k, first + 4 + 3 * k), 8))
+    bets += [
+        ("outside_low", _text(*range(1, 19)), 1),
+        ("outside_high", _text(*range(19, 37)), 1),
+        ("outside_oerb", _text(*range(2, 37, 2)), 1),
+        ("outside_oerb", "1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36", 1),
+        ("outside_oerb", "2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35", 1),
+        ("outside_oerb", _text(*range(1, 37, 2)), 1),
+    ]
+    bets += [("outside_dozen", _text(*range(12 * d + 1, 12 * d + 13)), 2) for d in range(3)]
+    bets += [("outside_column", _text(*range(c, 37, 3)), 2) for c in (3, 2, 1)]
+    return bets
+
+def old_api_spin(balance, bets, winning):
+    """Cálculo de /api/spin antes del motor compilado (saldo nuevo y ganancia)"""
+    current_bet = sum(b.amt for b in bets)
+    numbers_bet = {int(x) for b in bets for x in b.numbers.split(",")}
+    win_value = 0
+    if winning in numbers_bet:
+        for b in bets:
+            if winning in [int(x.strip()) for x in b.numbers.split(",")]:
+                win_value += b.odds * b.amt
+    new_balance = balance - current_bet + win_value
+    if win_value > 0:
+        new_balance += current_bet
+    return new_balance, win_value
+
+@pytest.mark.parametrize("kind,numbers,odds", app_js_bets())
+def test_app_js_bets_compile(kind, numbers, odds):
+    layout = lookup_bet(numbers)
+    assert layout is not None
+    assert layout.odds == odds
+    payouts, total = compile_bets([Bet(10, kind, odds, numbers)])
+    assert total == 10
+    covered = {int(x) for x in numbers.split(",")}
+    assert payouts == tuple(odds * 10 if n in covered else 0 for n in range(NUM_POCKETS))
+
+def test_lookup_bet_accepts_other_order_and_spacing():
+    assert lookup_bet("6,3") == lookup_bet("3, 6")
+    assert lookup_bet(" 5 ,4,2, 1") == lookup_bet("1, 2, 4, 5")
+
+@pytest.mark.parametrize("numbers", [
+    "1, 36",                 # no son vecinos
+    "3, 4",                  # cruza de fila
+    "1, 2, 3, 4",            # no es un cuadro
+    "1, 2, 3, 4, 5",         # cinco números
+    "0, 1, 2, 3, 4",
+    _text(*range(1, 13), 13),
+    "37",
+    "",
+    "uno",
+])
+def test_made_up_sets_rejected(numbers):
+    assert lookup_bet(numbers) is None
+    with pytest.raises(InvalidBet):
+        compile_bets([Bet(10, "inside_whole", 35, numbers)])
+
+def test_wrong_odds_rejected():
+    with pytest.raises(InvalidBet):
+        compile_bets([Bet(10, "split", 35, "1, 2")])
+
+def test_negative_amount_rejected():
+    with pytest.raises(InvalidBet):
+        compile_bets([Bet(-10, "inside_whole", 35, "7")])
+
+def test_net_result_matches_old_api_spin():
+    rng = random.Random(1234)
+    catalog = app_js_bets()
+    balance = 1000
+    for size in (1, 2, 3, 5):
+        for _ in range(50):
+            bets = [Bet(rng.choice((1, 5, 10, 100)), kind, odds, numbers)
+                    for kind, numbers, odds in rng.sample(catalog, size)]
+            payouts, stake = compile_bets(bets)
+            for winning in range(NUM_POCKETS):
+                expected_balance, expected_win = old_api_spin(balance, bets, winning)
+                assert payouts[winning] == expected_win
+                assert balance + net_result(stake, payouts[winning]) == expected_balance
+
+def test_net_result_returns_whole_stake_when_anything_wins():
+    # Rojo y pleno al 0: si sale rojo se devuelven las dos fichas
+    red = "1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36"
+    payouts, stake = compile_bets([Bet(10, "outside_oerb", 1, red), Bet(10, "zero", 35, "0")])
+    assert stake == 20
+    assert net_result(stake, payouts[1]) == 10
+    assert net_result(stake, payouts[0]) == 350
+    assert net_result(stake, payouts[2]) == -20
+
+def test_play_spins_follows_single_spin_rules():
+    payouts, stake = compile_bets([Bet(10, "inside_whole", 35, "7")])
+    draws = itertools.cycle([7, 1, 2])
+    results = play_spins(payouts, stake, 100, lambda: next(draws), 3)
+    assert results == [(7, 350, 450), (1, 0, 440), (2, 0, 430)]
+
+def test_play_spins_stops_when_balance_runs_out():
+    payouts, stake = compile_bets([Bet(10, "inside_whole", 35, "7")])
+    results = play_spins(payouts, stake, 25, lambda: 1, 10)
+    assert [balance for _, _, balance in results] == [15, 5]
+
+def test_play_spins_stop_loss_and_stop_win():
+    payouts, stake = compile_bets([Bet(10, "inside_whole", 35, "7")])
+    assert len(play_spins(payouts, stake, 1000, lambda: 1, 100, stop_loss=30)) == 3
+    assert len(play_spins(payouts, stake, 1000, lambda: 7, 100, stop_win=300)) == 1
@@ -0,0 +1,137 @@
+# wallet.py - Liquidación atómica de saldos
+import asyncio
+import time
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import Integer, Numeric, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Saldo
+from balances import hot_balances
+import metrics
+from metrics import SALDO_QUERY, DB_COMMIT
+
+class InFlight:
+    """
+    Giros en curso (desde el cobro hasta quedar en el historial).
+    Al apagar se espera a que lleguen a cero antes de cerrar el ledger y la BD,
+    así un deploy nunca deja un giro cobrado sin registrar.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def __enter__(self):
+        self.count += 1
+        self._idle.clear()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """True si se vaciaron antes de 'timeout' segundos"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+spins_in_flight = InFlight()
+metrics.gauge("ruleta_spins_in_flight", "Giros liquidándose en este momento", lambda: spins_in_flight.count)
+
+async def settle_spin(db: AsyncSession, id_usuario: int, stake: Decimal, delta: Decimal) -> Optional[Decimal]:
+    """
+    Cobrar la apuesta y abonar la ganancia en un solo UPDATE condicional.
+    Devuelve el nuevo saldo, o None si no hay saldo suficiente (o no existe la fila).
+    La condición saldo_actual >= stake evita la carrera entre dos pestañas del mismo usuario.
+    """
+    if hot_balances.enabled:
+        return await hot_balances.settle(db, id_usuario, stake, delta)
+    stmt = (
+        update(Saldo)
+        .where(Saldo.id_usuario == id_usuario, Saldo.saldo_actual >= stake)
+        .values(saldo_actual=Saldo.saldo_actual + delta)
+        .returning(Saldo.saldo_actual)
+    )
+    start = time.perf_counter()
+    new_balance = (await db.execute(stmt)).scalar_one_or_none()
+    committing = time.perf_counter()
+    SALDO_QUERY.observe(committing - start)
+    await db.commit()
+    DB_COMMIT.observe(time.perf_counter() - committing)
+    return new_balance
+
+async def get_balance(db: AsyncSession, id_usuario: int) -> Optional[Decimal]:
+    """Leer solo el saldo actual (None si el usuario no tiene fila de saldo)"""
+    if hot_balances.enabled:
+        return await hot_balances.get(db, id_usuario)
+    stmt = select(Saldo.saldo_actual).where(Saldo.id_usuario == id_usuario)
+    start = time.perf_counter()
+    balance = (await db.execute(stmt)).scalar_one_or_none()
+    SALDO_QUERY.observe(time.perf_counter() - start)
+    return balance
+
+async def has_saldo(db: AsyncSession, id_usuario: int) -> bool:
+    """Comprobar si el usuario tiene fila de saldo (solo en el camino de error)"""
+    stmt = select(Saldo.id_saldo).where(Saldo.id_usuario == id_usuario)
+    return (await db.execute(stmt)).first() is not None
+
+async def settle_batch(db: AsyncSession, id_usuario: int, play) -> Optional[list]:
+    """
+    Jugar varios giros sobre el saldo bloqueado (SELECT ... FOR UPDATE) y aplicar
+    el cambio neto en la misma transacción.
+    play(saldo) -> (resultados, saldo_final). Devuelve None si no existe la fila.
+    """
+    if hot_balances.enabled:
+        return await hot_balances.settle_batch(db, id_usuario, play)
+    stmt = select(Saldo.saldo_actual).where(Saldo.id_usuario == id_usuario).with_for_update()
+    balance = (await db.execute(stmt)).scalar_one_or_none()
+    if balance is None:
+        await db.rollback()
+        return None
+
+    results, final_balance = play(balance)
+    if final_balance != balance:
+        await db.execute(
+            update(Saldo)
+            .where(Saldo.id_usuario == id_usuario)
+            .values(saldo_actual=Saldo.saldo_actual + (final_balance - balance))
+        )
+    start = time.perf_counter()
+    await db.commit()
+    DB_COMMIT.observe(time.perf_counter() - start)
+    return results
+
+async def settle_round(db: AsyncSession, rows: list) -> dict:
+    """
+    Liquidar una ronda de mesa con un solo UPDATE ... FROM (VALUES ...).
+    rows: [(id_usuario, stake, delta), ...]. Solo se aplican las filas con
+    saldo_actual >= stake; devuelve {id_usuario: nuevo_saldo} de las liquidadas.
+    """
+    if hot_balances.enabled:
+        return await hot_balances.settle_round(db, rows)
+    v = values(
+        column("id_usuario", Integer),
+        column("stake", Numeric(10, 2)),
+        column("delta", Numeric(10, 2)),
+        name="v",
+    ).data(rows)
+    stmt = (
+        update(Saldo)
+        .where(Saldo.id_usuario == v.c.id_usuario, Saldo.saldo_actual >= v.c.stake)
+        .values(saldo_actual=Saldo.saldo_actual + v.c.delta)
+        .returning(Saldo.id_usuario, Saldo.saldo_actual)
+        .execution_options(synchronize_session=False)
+    )
+    start = time.perf_counter()
+    result = await db.execute(stmt)
+    balances = dict(result.all())
+    committing = time.perf_counter()
+    SALDO_QUERY.observe(committing - start)
+    await db.commit()
+    DB_COMMIT.observe(time.perf_counter() - committing)
+    return balances